@@ -0,0 +1,112 @@
+import argparse
+import cProfile
+import pstats
+import time
+
+from host import runtime
+
+# Profiles Theme.tick() off-device: python -m host.bench mario --frames 5000
+
+
+def bench_theme(
+    name, frames=5000, fps=50, width=64, height=32, render=False, snapshot=None, phases=False
+):
+    hostenv = runtime.setup(
+        secrets=dict(matrix_width=width, matrix_height=height), manual_clock=True
+    )
+    from adafruit_ticks import ticks_ms
+    from app.storage import store
+    from app.clock import frame_clock
+    from app.profiler import profiler
+    from adafruit_bitmap_font import bitmap_font
+    from host.framebuffer import Framebuffer
+
+    runtime.build_hass(store)
+    font = bitmap_font.load_font("/bitocra7.bdf")
+    theme = runtime.load_theme(name).Theme(width=width, height=height, font=font)
+    framebuffer = Framebuffer(width, height)
+    if phases:
+        # wall clock timings, the manual clock only advances between frames
+        profiler.enabled = True
+        profiler.clock = time.perf_counter_ns
+        profiler.instrument(theme)
+    hostenv.counters.clear()
+    frame_time = 1 / fps
+    tick_total = 0.0
+    render_total = 0.0
+    tick_max = 0.0
+    for _ in range(frames):
+        hostenv.clock.advance(frame_time)
+        start = time.perf_counter()
+        phase = profiler.start()
+        epochs = frame_clock.update()
+        store["ticks"] = ticks_ms()
+        profiler.stop("epochs", phase)
+        phase = profiler.start()
+        theme.tick(store, epochs)
+        profiler.stop("theme", phase)
+        store["frame"] += 1
+        elapsed = time.perf_counter() - start
+        tick_total += elapsed
+        tick_max = max(tick_max, elapsed)
+        if render:
+            start = time.perf_counter()
+            framebuffer.render(theme.group)
+            render_total += time.perf_counter() - start
+    if snapshot:
+        framebuffer.render(theme.group)
+        framebuffer.to_ppm(snapshot)
+    return dict(
+        theme=name,
+        frames=frames,
+        tick_us_mean=tick_total / frames * 1e6,
+        tick_us_max=tick_max * 1e6,
+        ticks_per_second=frames / tick_total if tick_total else 0,
+        render_us_mean=render_total / frames * 1e6 if render else None,
+        dirty_area_per_frame=hostenv.counters.get("dirty_area", 0) / frames,
+        counters=dict(hostenv.counters),
+        phases=profiler.report() if phases else None,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile Theme.tick() on the host")
+    parser.add_argument("theme", nargs="?", default="mario", choices=runtime.THEMES)
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--fps", type=int, default=50, help="simulated frame rate")
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--height", type=int, default=32)
+    parser.add_argument("--render", action="store_true", help="composite every frame")
+    parser.add_argument("--snapshot", help="write the final frame to a PPM file")
+    parser.add_argument("--profile", action="store_true", help="print cProfile stats")
+    parser.add_argument("--phases", action="store_true", help="report per phase p50/p99/max")
+    args = parser.parse_args()
+    kwargs = dict(
+        frames=args.frames,
+        fps=args.fps,
+        width=args.width,
+        height=args.height,
+        render=args.render,
+        snapshot=args.snapshot,
+        phases=args.phases,
+    )
+    if args.profile:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(bench_theme, args.theme, **kwargs)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        result = bench_theme(args.theme, **kwargs)
+    print()
+    phases = result.pop("phases")
+    for key, value in result.items():
+        if isinstance(value, float):
+            value = f"{value:.1f}"
+        print(f"{key:>18}: {value}")
+    if phases:
+        print()
+        for name, stats in phases.items():
+            print(f"{name:>24}: p50={stats['p50']:.3f}ms p99={stats['p99']:.3f}ms max={stats['max']:.3f}ms count={stats['count']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import time
+
+from host import runtime
+from host.timeserver import TimeServer, SNTPServer
+
+# Measures time sync against local stand-in servers while a fake render loop
+# runs, to show sync cost and its impact on frame gaps:
+# python -m host.bench_timesync --delay 0.5 --offset 1.5
+
+
+async def _render(stop, gaps, frame_time):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(frame_time)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def _measure(timesync, frame_time):
+    stop = asyncio.Event()
+    gaps = []
+    render = asyncio.create_task(_render(stop, gaps, frame_time))
+    await asyncio.sleep(frame_time * 3)
+    start = time.perf_counter()
+    ok = await timesync.sync()
+    wall = time.perf_counter() - start
+    stop.set()
+    await render
+    return ok, wall, max(gaps)
+
+
+def bench_timesync(offset=1.5, delay=0.0, fail=False, frame_rate=30):
+    # the stand-in servers serve UTC, keep the SNTP local offset in line
+    hostenv = runtime.setup(secrets=dict(utc_offset=0, dst=None))
+    import adafruit_esp32spi.adafruit_esp32spi_socket as socket
+    from app.clock import frame_clock
+    from app.timesync import TimeSync, HTTPTimeSource, SNTPTimeSource
+
+    results = []
+    with TimeServer(offset=offset, delay=delay, fail=fail) as server, SNTPServer(
+        offset=offset, delay=delay, fail=fail
+    ) as sntp_server:
+        sources = [
+            SNTPTimeSource(socket, sntp_server.host, sntp_server.port),
+            HTTPTimeSource(socket, server.url),
+        ]
+        for source in sources:
+            frame_clock.anchor()
+            timesync = TimeSync([source])
+            hostenv.counters.clear()
+            ok, wall, max_gap = asyncio.run(_measure(timesync, 1 / frame_rate))
+            results.append(
+                dict(
+                    source=source.name,
+                    ok=ok,
+                    wall_ms=wall * 1000,
+                    bytes=source.bytes if ok else None,
+                    latency_ms=timesync.latency_ms,
+                    offset_ms=timesync.offset_ms,
+                    slew_ms=frame_clock.slew_ms,
+                    max_frame_gap_ms=max_gap * 1000,
+                )
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark network time sources")
+    parser.add_argument("--offset", type=float, default=1.5, help="server clock offset (s)")
+    parser.add_argument("--delay", type=float, default=0.0, help="server response delay (s)")
+    parser.add_argument("--fail", action="store_true", help="server returns errors")
+    args = parser.parse_args()
+    for result in bench_timesync(args.offset, args.delay, args.fail):
+        print(" ".join(
+            f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in result.items()
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import numpy as np
+
+import displayio
+import vectorio
+
+# NumPy framebuffer that composites a displayio Group/TileGrid/Label tree the
+# way the Matrix Portal display does, so frames can be inspected off-device
+
+
+class Framebuffer:
+    def __init__(self, width, height, background=0x000000):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.pixels = np.zeros((height, width), dtype=np.uint32)
+        self.frames = 0
+
+    def render(self, group):
+        self.pixels[:, :] = self.background
+        self._draw(group, 0, 0, 1)
+        self.frames += 1
+        return self.pixels
+
+    def _draw(self, layer, ox, oy, scale):
+        if layer.hidden:
+            return
+        if isinstance(layer, displayio.Group):
+            ox += layer.x * scale
+            oy += layer.y * scale
+            scale *= layer.scale
+            for child in layer:
+                self._draw(child, ox, oy, scale)
+        elif isinstance(layer, displayio.TileGrid):
+            self._draw_tilegrid(layer, ox + layer.x * scale, oy + layer.y * scale, scale)
+        elif isinstance(layer, vectorio.Rectangle):
+            mask = np.ones((layer.height, layer.width), dtype=bool)
+            self._draw_shape(layer, mask, ox + layer.x * scale, oy + layer.y * scale, scale)
+        elif isinstance(layer, vectorio.Circle):
+            r = layer.radius
+            yy, xx = np.mgrid[-r : r + 1, -r : r + 1]
+            mask = xx * xx + yy * yy <= r * r
+            self._draw_shape(
+                layer, mask, ox + (layer.x - r) * scale, oy + (layer.y - r) * scale, scale
+            )
+
+    def _draw_tilegrid(self, grid, x, y, scale):
+        bitmap = grid.bitmap
+        tw, th = grid.tile_width, grid.tile_height
+        per_row = bitmap.width // tw
+        indices = np.empty((grid.height * th, grid.width * tw), dtype=np.uint16)
+        for ty in range(grid.height):
+            for tx in range(grid.width):
+                tile = int(grid.tiles[ty, tx])
+                sx = (tile % per_row) * tw
+                sy = (tile // per_row) * th
+                indices[ty * th : (ty + 1) * th, tx * tw : (tx + 1) * tw] = bitmap.data[
+                    sy : sy + th, sx : sx + tw
+                ]
+        if grid.transpose_xy:
+            indices = indices.T
+        if grid.flip_x:
+            indices = indices[:, ::-1]
+        if grid.flip_y:
+            indices = indices[::-1, :]
+        palette = grid.pixel_shader
+        # out of range indices (stray pixels in a sheet) are not drawn
+        valid = indices < len(palette)
+        indices = np.where(valid, indices, 0)
+        colors = palette.colors[indices]
+        mask = valid & ~palette.transparent[indices]
+        self._blit(colors, mask, x, y, scale)
+
+    def _draw_shape(self, shape, mask, x, y, scale):
+        palette = shape.pixel_shader
+        if palette.is_transparent(shape.color_index):
+            return
+        colors = np.full(mask.shape, palette[shape.color_index], dtype=np.uint32)
+        self._blit(colors, mask, x, y, scale)
+
+    def _blit(self, colors, mask, x, y, scale):
+        if scale != 1:
+            colors = colors.repeat(scale, axis=0).repeat(scale, axis=1)
+            mask = mask.repeat(scale, axis=0).repeat(scale, axis=1)
+        h, w = colors.shape
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, self.width), min(y + h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        src = colors[y0 - y : y1 - y, x0 - x : x1 - x]
+        src_mask = mask[y0 - y : y1 - y, x0 - x : x1 - x]
+        dst = self.pixels[y0:y1, x0:x1]
+        dst[src_mask] = src[src_mask]
+
+    def to_ppm(self, path):
+        rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        rgb[:, :, 0] = self.pixels >> 16
+        rgb[:, :, 1] = (self.pixels >> 8) & 0xFF
+        rgb[:, :, 2] = self.pixels & 0xFF
+        with open(path, "wb") as f:
+            f.write(f"P6 {self.width} {self.height} 255\n".encode())
+            f.write(rgb.tobytes())
+
+    def to_text(self):
+        return "\n".join(
+            "".join("#" if pixel else "." for pixel in row) for row in self.pixels
+        )
@@ -0,0 +1,134 @@
+import os
+import time
+
+# Shared state for the host stand-in modules (clock, filesystem, broker, http)
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+
+# CLOCK
+
+
+class Clock:
+    def __init__(self, epoch=None, manual=False):
+        self.epoch = time.time() if epoch is None else epoch
+        self.manual = manual
+        self._real_monotonic = time.monotonic
+        self._base = self._real_monotonic()
+        self._offset = 0.0
+
+    def monotonic(self):
+        if self.manual:
+            return self._offset
+        return self._real_monotonic() - self._base + self._offset
+
+    def advance(self, seconds):
+        self._offset += seconds
+
+    def now(self):
+        return self.epoch + self.monotonic()
+
+    def set_now(self, ts):
+        self.epoch = ts - self.monotonic()
+
+    def install(self):
+        # Only a manual clock replaces time.monotonic, asyncio needs real time
+        if self.manual:
+            time.monotonic = self.monotonic
+            time.monotonic_ns = lambda: int(self.monotonic() * 1e9)
+
+    def uninstall(self):
+        time.monotonic = self._real_monotonic
+        time.monotonic_ns = lambda: int(self._real_monotonic() * 1e9)
+
+
+clock = Clock()
+
+
+# FILESYSTEM
+
+mounts = {}
+
+
+def mount(path, real_path):
+    mounts[path] = os.path.abspath(real_path)
+
+
+def resolve(path):
+    if path in mounts:
+        return mounts[path]
+    if path.startswith("/"):
+        return os.path.join(SRC_DIR, path.lstrip("/"))
+    return path
+
+
+# MQTT BROKER
+
+
+class Broker:
+    def __init__(self):
+        self.retained = {}
+        self.published = []
+        self.pending = []
+        self.subscriptions = set()
+        self.online = True
+
+    def publish(self, topic, payload, retain=False):
+        self.published.append((topic, payload))
+        if retain:
+            self.retained[topic] = payload
+
+    def inject(self, topic, payload):
+        self.pending.append((topic, payload))
+
+    def reset(self):
+        self.__init__()
+
+
+broker = Broker()
+
+
+# HTTP
+
+http_routes = {}
+
+
+def route(prefix, handler):
+    http_routes[prefix] = handler
+
+
+# DISPLAYS
+
+displays = []
+
+
+# GPIO
+
+key_events = []
+
+
+# COUNTERS
+
+counters = {}
+screen = (64, 32)
+
+
+def count(name, value=1):
+    counters[name] = counters.get(name, 0) + value
+
+
+def dirty(before, after):
+    # area displayio has to recomposite for one change: the bounding box of
+    # the old and new rectangle (x1, y1, x2, y2, None when hidden) clipped to
+    # the screen, parent group offsets are not applied
+    rects = [rect for rect in (before, after) if rect is not None]
+    if not rects:
+        return
+    x1 = max(min(rect[0] for rect in rects), 0)
+    y1 = max(min(rect[1] for rect in rects), 0)
+    x2 = min(max(rect[2] for rect in rects), screen[0])
+    y2 = min(max(rect[3] for rect in rects), screen[1])
+    if x2 <= x1 or y2 <= y1:
+        return
+    count("dirty_area", (x2 - x1) * (y2 - y1))
+    count("dirty_changes")
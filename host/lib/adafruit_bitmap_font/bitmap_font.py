@@ -0,0 +1,81 @@
+import displayio
+from fontio import Glyph
+import _hostenv
+
+# Host stand-in for adafruit_bitmap_font, BDF glyphs are parsed lazily like the
+# device library so that file scans can be counted
+
+
+class BDF:
+    def __init__(self, path, bitmap_class=displayio.Bitmap):
+        self.path = path
+        self.bitmap_class = bitmap_class
+        self._glyphs = {}
+        self._boundingbox = (0, 0, 0, 0)
+        self.ascent = 0
+        self.descent = 0
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith("FONTBOUNDINGBOX "):
+                    self._boundingbox = tuple(int(v) for v in line.split()[1:5])
+                elif line.startswith("FONT_ASCENT "):
+                    self.ascent = int(line.split()[1])
+                elif line.startswith("FONT_DESCENT "):
+                    self.descent = int(line.split()[1])
+                elif line.startswith("ENDPROPERTIES"):
+                    break
+
+    def get_bounding_box(self):
+        return self._boundingbox
+
+    def get_glyph(self, code_point):
+        if code_point not in self._glyphs:
+            self.load_glyphs((code_point,))
+        return self._glyphs.get(code_point)
+
+    def load_glyphs(self, code_points):
+        if isinstance(code_points, int):
+            code_points = (code_points,)
+        elif isinstance(code_points, str):
+            code_points = [ord(c) for c in code_points]
+        remaining = set(code_points) - set(self._glyphs)
+        if not remaining:
+            return
+        _hostenv.count("font_file_scans")
+        code_point = None
+        rows = None
+        with open(self.path, "r") as f:
+            for line in f:
+                if line.startswith("ENCODING "):
+                    code_point = int(line.split()[1])
+                elif line.startswith("DWIDTH "):
+                    shift_x, shift_y = (int(v) for v in line.split()[1:3])
+                elif line.startswith("BBX "):
+                    width, height, dx, dy = (int(v) for v in line.split()[1:5])
+                elif line.startswith("BITMAP"):
+                    rows = [] if code_point in remaining else None
+                elif line.startswith("ENDCHAR"):
+                    if rows is not None:
+                        bitmap = self.bitmap_class(width, height, 2)
+                        for y, row in enumerate(rows):
+                            bits = int(row, 16)
+                            total = len(row) * 4
+                            for x in range(width):
+                                if bits & (1 << (total - 1 - x)):
+                                    bitmap[x, y] = 1
+                        self._glyphs[code_point] = Glyph(
+                            bitmap, 0, width, height, dx, dy, shift_x, shift_y
+                        )
+                        remaining.discard(code_point)
+                        _hostenv.count("font_glyphs_loaded")
+                    rows = None
+                    if not remaining:
+                        break
+                elif rows is not None:
+                    rows.append(line.strip())
+        for code_point in remaining:
+            self._glyphs[code_point] = None
+
+
+def load_font(filename, bitmap=None):
+    return BDF(_hostenv.resolve(filename), bitmap or displayio.Bitmap)
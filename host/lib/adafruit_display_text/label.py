@@ -0,0 +1,76 @@
+from displayio import Group, Palette, TileGrid
+import _hostenv
+
+# Host stand-in for adafruit_display_text.label, one TileGrid per glyph
+
+
+class Label(Group):
+    def __init__(
+        self,
+        font,
+        *,
+        text="",
+        color=0xFFFFFF,
+        background_color=None,
+        x=0,
+        y=0,
+        scale=1,
+        **kwargs
+    ):
+        super().__init__(x=x, y=y, scale=scale)
+        self.font = font
+        self._palette = Palette(2)
+        self._palette.make_transparent(0)
+        self._color = None
+        self.color = color
+        self._text = None
+        self.text = text
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, new_color):
+        self._color = new_color
+        if new_color is None:
+            self._palette.make_transparent(1)
+        else:
+            self._palette.make_opaque(1)
+            self._palette[1] = new_color
+        _hostenv.count("label_color_writes")
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, new_text):
+        self._text = new_text
+        self._layout()
+
+    def _layout(self):
+        _hostenv.count("label_layouts")
+        del self[:]
+        x = 0
+        y_offset = self.font.ascent // 2
+        for char in self._text:
+            glyph = self.font.get_glyph(ord(char))
+            if glyph is None:
+                continue
+            if glyph.width and glyph.height:
+                self.append(
+                    TileGrid(
+                        glyph.bitmap,
+                        pixel_shader=self._palette,
+                        width=1,
+                        height=1,
+                        tile_width=glyph.width,
+                        tile_height=glyph.height,
+                        default_tile=glyph.tile_index,
+                        x=x + glyph.dx,
+                        y=y_offset - glyph.height - glyph.dy,
+                    )
+                )
+            x += glyph.shift_x
+        self._width = x
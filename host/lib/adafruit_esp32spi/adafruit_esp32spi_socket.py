@@ -0,0 +1,64 @@
+import select
+import socket as _socket
+
+import _hostenv
+
+# Host stand-in for adafruit_esp32spi_socket, backed by real CPython sockets so
+# network code can be exercised against local servers
+
+AF_INET = 2
+SOCK_STREAM = 1
+SOCK_DGRAM = 2
+
+_the_interface = None
+
+
+def set_interface(iface):
+    global _the_interface
+    _the_interface = iface
+
+
+def getaddrinfo(host, port, family=0, socktype=0, proto=0, flags=0):
+    return [(AF_INET, socktype, proto, "", (_socket.gethostbyname(host), port))]
+
+
+class socket:
+    def __init__(self, family=AF_INET, type=SOCK_STREAM, proto=0, fileno=None):
+        self._type = type
+        self._socket = _socket.socket(
+            _socket.AF_INET,
+            _socket.SOCK_DGRAM if type == SOCK_DGRAM else _socket.SOCK_STREAM,
+        )
+        self._address = None
+
+    def settimeout(self, value):
+        self._socket.settimeout(value)
+
+    def connect(self, address, conntype=None):
+        self._address = address
+        self._socket.connect(address)
+
+    def send(self, data):
+        _hostenv.count("socket_tx_bytes", len(data))
+        self._socket.send(data)
+
+    def available(self):
+        readable, _, _ = select.select([self._socket], [], [], 0)
+        if not readable:
+            return 0
+        if self._type == SOCK_DGRAM:
+            return len(self._socket.recv(2048, _socket.MSG_PEEK))
+        return len(self._socket.recv(2048, _socket.MSG_PEEK | _socket.MSG_DONTWAIT))
+
+    def recv_into(self, buffer, nbytes=0):
+        count = self._socket.recv_into(buffer, nbytes or len(buffer))
+        _hostenv.count("socket_rx_bytes", count)
+        return count
+
+    def recv(self, bufsize=0):
+        data = self._socket.recv(bufsize or 2048)
+        _hostenv.count("socket_rx_bytes", len(data))
+        return data
+
+    def close(self):
+        self._socket.close()
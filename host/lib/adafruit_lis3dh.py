@@ -0,0 +1,15 @@
+from collections import namedtuple
+
+# Host stand-in for adafruit_lis3dh, reports an upright panel (rotation 0)
+
+AccelerationTuple = namedtuple("acceleration", ("x", "y", "z"))
+
+
+class LIS3DH_I2C:
+    def __init__(self, i2c, *, address=0x18, int1=None, int2=None):
+        self.i2c = i2c
+        self.address = address
+
+    @property
+    def acceleration(self):
+        return AccelerationTuple(0.0, 9.8, 0.0)
@@ -0,0 +1,22 @@
+import displayio
+
+# Host stand-in for adafruit_matrixportal.matrix
+
+
+class Matrix:
+    def __init__(
+        self,
+        *,
+        width=64,
+        height=32,
+        bit_depth=2,
+        alt_addr_pins=None,
+        color_order="RGB",
+        serpentine=True,
+        tile_rows=1,
+        rotation=0
+    ):
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.display = displayio.Display(width, height, rotation=rotation)
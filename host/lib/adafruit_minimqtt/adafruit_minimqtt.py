@@ -0,0 +1,82 @@
+import _hostenv
+
+# Host stand-in for adafruit_minimqtt, backed by the in-process broker in _hostenv
+
+
+class MMQTTException(Exception):
+    pass
+
+
+def set_socket(sock, iface=None):
+    pass
+
+
+class MQTT:
+    def __init__(
+        self,
+        broker,
+        port=None,
+        username=None,
+        password=None,
+        client_id=None,
+        is_ssl=False,
+        keep_alive=60,
+        socket_pool=None,
+        **kwargs
+    ):
+        self.broker = broker
+        self.port = port
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self._connected = False
+
+    def _check(self):
+        if not _hostenv.broker.online:
+            self._connected = False
+            raise MMQTTException("broker offline")
+
+    def connect(self, clean_session=True, host=None, port=None, keep_alive=None):
+        self._check()
+        self._connected = True
+        if self.on_connect is not None:
+            self.on_connect(self, None, 0, 0)
+        return 0
+
+    def disconnect(self):
+        self._connected = False
+        if self.on_disconnect is not None:
+            self.on_disconnect(self, None, 0)
+
+    def is_connected(self):
+        return self._connected
+
+    def ping(self):
+        self._check()
+        return []
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        self._check()
+        if isinstance(msg, (bytes, bytearray)):
+            msg = msg.decode()
+        _hostenv.count("mqtt_publish_bytes", len(topic) + len(msg))
+        _hostenv.broker.publish(topic, msg, retain)
+
+    def subscribe(self, topic, qos=0):
+        self._check()
+        _hostenv.broker.subscriptions.add(topic)
+
+    def unsubscribe(self, topic):
+        _hostenv.broker.subscriptions.discard(topic)
+
+    def loop(self, timeout=0):
+        self._check()
+        pending = _hostenv.broker.pending
+        if not pending or self.on_message is None:
+            return None
+        rcs = []
+        while pending:
+            topic, payload = pending.pop(0)
+            self.on_message(self, topic, payload)
+            rcs.append(3)
+        return rcs
@@ -0,0 +1,40 @@
+import json
+
+import _hostenv
+
+# Host stand-in for adafruit_requests, urls are served from _hostenv.http_routes
+
+
+class Response:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def set_socket(sock, iface=None):
+    pass
+
+
+def request(method, url, data=None, json=None, headers=None, timeout=60):
+    for prefix, handler in _hostenv.http_routes.items():
+        if url.startswith(prefix):
+            status_code, content = handler(method, url)
+            if isinstance(content, str):
+                content = content.encode()
+            _hostenv.count("http_bytes", len(content))
+            return Response(status_code, content)
+    raise OSError(f"host: no route for {url}")
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
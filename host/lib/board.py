@@ -0,0 +1,8 @@
+# Host stand-in for the Matrix Portal M4 board pins
+
+SCL = "SCL"
+SDA = "SDA"
+BUTTON_UP = "BUTTON_UP"
+BUTTON_DOWN = "BUTTON_DOWN"
+NEOPIXEL = "NEOPIXEL"
+L = "L"
@@ -0,0 +1,10 @@
+# Host stand-in for CircuitPython's busio
+
+
+class I2C:
+    def __init__(self, scl, sda, *, frequency=100000):
+        self.scl = scl
+        self.sda = sda
+
+    def deinit(self):
+        pass
@@ -0,0 +1,47 @@
+import displayio
+
+# Host stand-in for cedargrove_palettefader
+
+
+class PaletteFader:
+    def __init__(self, source_palette, brightness=1.0, gamma=1.0, normalize=False):
+        self._src_palette = source_palette
+        self._brightness = brightness
+        self._gamma = gamma
+        self._normalize = normalize
+        self._ref_palette = [source_palette[i] for i in range(len(source_palette))]
+        self._new_palette = displayio.Palette(len(source_palette))
+        self.fade_normalize()
+
+    @property
+    def palette(self):
+        return self._new_palette
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, new_brightness):
+        self._brightness = new_brightness
+        self.fade_normalize()
+
+    def fade_normalize(self):
+        max_component = 0
+        if self._normalize:
+            for color in self._ref_palette:
+                max_component = max(
+                    max_component, color >> 16, (color >> 8) & 0xFF, color & 0xFF
+                )
+        factor = 0xFF / max_component if max_component else 1.0
+        for i, color in enumerate(self._ref_palette):
+            channels = []
+            for shift in (16, 8, 0):
+                value = ((color >> shift) & 0xFF) * factor / 0xFF
+                value = min(0xFF, round((value**self._gamma) * self._brightness * 0xFF))
+                channels.append(value)
+            self._new_palette[i] = tuple(channels)
+            if self._src_palette.is_transparent(i):
+                self._new_palette.make_transparent(i)
+            else:
+                self._new_palette.make_opaque(i)
@@ -0,0 +1,288 @@
+import struct
+import time
+
+import numpy as np
+
+import _hostenv
+
+# Host stand-in for CircuitPython's displayio, backed by NumPy arrays
+
+
+def release_displays():
+    pass
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self.data = np.zeros((height, width), dtype=np.uint16)
+
+    def _xy(self, index):
+        if isinstance(index, tuple):
+            return index
+        return index % self.width, index // self.width
+
+    def __getitem__(self, index):
+        x, y = self._xy(index)
+        return int(self.data[y, x])
+
+    def __setitem__(self, index, value):
+        x, y = self._xy(index)
+        self.data[y, x] = value
+
+    def fill(self, value):
+        self.data[:, :] = value
+
+    def blit(self, x, y, source_bitmap, *, x1=0, y1=0, x2=None, y2=None, skip_index=None):
+        x2 = source_bitmap.width if x2 is None else x2
+        y2 = source_bitmap.height if y2 is None else y2
+        src = source_bitmap.data[y1:y2, x1:x2]
+        h = min(src.shape[0], self.height - y)
+        w = min(src.shape[1], self.width - x)
+        src = src[:h, :w]
+        dst = self.data[y : y + h, x : x + w]
+        if skip_index is None:
+            dst[:, :] = src
+        else:
+            mask = src != skip_index
+            dst[mask] = src[mask]
+
+
+class Palette:
+    def __init__(self, color_count):
+        self.colors = np.zeros(color_count, dtype=np.uint32)
+        self.transparent = np.zeros(color_count, dtype=bool)
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __getitem__(self, index):
+        return int(self.colors[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(value, (tuple, list, bytes, bytearray)):
+            value = (value[0] << 16) | (value[1] << 8) | value[2]
+        self.colors[index] = value & 0xFFFFFF
+
+    def make_transparent(self, index):
+        self.transparent[index] = True
+
+    def make_opaque(self, index):
+        self.transparent[index] = False
+
+    def is_transparent(self, index):
+        return bool(self.transparent[index])
+
+
+class ColorConverter:
+    def __init__(self, *, input_colorspace=None, dither=False):
+        self.dither = dither
+
+
+class OnDiskBitmap(Bitmap):
+    def __init__(self, file):
+        path = _hostenv.resolve(file if isinstance(file, str) else file.name)
+        with open(path, "rb") as f:
+            raw = f.read()
+        if raw[:2] != b"BM":
+            raise ValueError("Invalid BMP file")
+        data_offset = struct.unpack_from("<I", raw, 10)[0]
+        header_size = struct.unpack_from("<I", raw, 14)[0]
+        width, height = struct.unpack_from("<ii", raw, 18)
+        bits = struct.unpack_from("<H", raw, 28)[0]
+        colors = struct.unpack_from("<I", raw, 46)[0] or (1 << bits)
+        if bits > 8:
+            raise NotImplementedError("Only indexed BMP files are supported")
+        self.width = width
+        self.height = abs(height)
+        self.value_count = colors
+        self.pixel_shader = Palette(colors)
+        table = 14 + header_size
+        for i in range(colors):
+            b, g, r = raw[table + i * 4 : table + i * 4 + 3]
+            self.pixel_shader[i] = (r, g, b)
+        stride = ((width * bits + 31) // 32) * 4
+        rows = np.frombuffer(raw, dtype=np.uint8, count=stride * self.height, offset=data_offset)
+        rows = np.unpackbits(rows.reshape(self.height, stride), axis=1)
+        rows = rows[:, : width * bits].reshape(self.height, width, bits)
+        weights = 1 << np.arange(bits - 1, -1, -1)
+        self.data = (rows * weights).sum(axis=2).astype(np.uint16)
+        if height > 0:
+            self.data = self.data[::-1].copy()
+        _hostenv.count("ondiskbitmap_bytes", len(raw))
+
+
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._layers = []
+
+    def append(self, layer):
+        self._layers.append(layer)
+
+    def insert(self, index, layer):
+        self._layers.insert(index, layer)
+
+    def remove(self, layer):
+        self._layers.remove(layer)
+
+    def pop(self, index=-1):
+        return self._layers.pop(index)
+
+    def index(self, layer):
+        return self._layers.index(layer)
+
+    def sort(self, key=None, reverse=False):
+        self._layers.sort(key=key, reverse=reverse)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, layer):
+        self._layers[index] = layer
+
+    def __delitem__(self, index):
+        del self._layers[index]
+
+    def __iter__(self):
+        return iter(self._layers)
+
+    def __contains__(self, layer):
+        return layer in self._layers
+
+
+_TILEGRID_DIRTY = ("x", "y", "hidden", "flip_x", "flip_y", "transpose_xy")
+
+
+class TileGrid:
+    def __init__(
+        self,
+        bitmap,
+        *,
+        pixel_shader,
+        width=1,
+        height=1,
+        tile_width=None,
+        tile_height=None,
+        default_tile=0,
+        x=0,
+        y=0,
+    ):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = bitmap.width if tile_width is None else tile_width
+        self.tile_height = bitmap.height if tile_height is None else tile_height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+        self.tiles = np.full((height, width), default_tile, dtype=np.uint16)
+
+    def _xy(self, index):
+        if isinstance(index, tuple):
+            return index
+        return index % self.width, index // self.width
+
+    def __getitem__(self, index):
+        x, y = self._xy(index)
+        return int(self.tiles[y, x])
+
+    def __setitem__(self, index, value):
+        x, y = self._xy(index)
+        if self.tiles[y, x] == value:
+            _hostenv.count("tilegrid_redundant_writes")
+            return
+        self.tiles[y, x] = value
+        if not self.hidden:
+            left = self.x + x * self.tile_width
+            top = self.y + y * self.tile_height
+            cell = (left, top, left + self.tile_width, top + self.tile_height)
+            _hostenv.dirty(cell, None)
+
+    def __setattr__(self, name, value):
+        # like displayio, only a changed value marks the grid dirty
+        if name in _TILEGRID_DIRTY and "tiles" in self.__dict__:
+            if getattr(self, name) == value:
+                _hostenv.count("tilegrid_redundant_writes")
+                return
+            before = self._bounds()
+            object.__setattr__(self, name, value)
+            _hostenv.dirty(before, self._bounds())
+            return
+        object.__setattr__(self, name, value)
+
+    def _bounds(self):
+        if self.hidden:
+            return None
+        width = self.width * self.tile_width
+        height = self.height * self.tile_height
+        if self.transpose_xy:
+            width, height = height, width
+        return (self.x, self.y, self.x + width, self.y + height)
+
+    def contains(self, touch_tuple):
+        x, y = touch_tuple[0], touch_tuple[1]
+        return (
+            self.x <= x < self.x + self.width * self.tile_width
+            and self.y <= y < self.y + self.height * self.tile_height
+        )
+
+
+class Display:
+    def __init__(self, width, height, rotation=0, auto_refresh=True):
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.auto_refresh = auto_refresh
+        self.root_group = None
+        self.framebuffer = None
+        self._first_manual_refresh = True
+        self._last_refresh = 0
+        self._last_refresh_call = 0
+        _hostenv.displays.append(self)
+
+    def show(self, group):
+        self.root_group = group
+        _hostenv.count("display_show")
+
+    def refresh(self, *, target_frames_per_second=60, minimum_frames_per_second=0):
+        # same pacing as CircuitPython: with a target rate a call later than
+        # one frame after the previous call is skipped, otherwise it blocks
+        # until the next frame boundary of its own phase
+        now = time.monotonic() * 1000
+        if (
+            not self.auto_refresh
+            and not self._first_manual_refresh
+            and target_frames_per_second is not None
+        ):
+            since_refresh = now - self._last_refresh
+            if minimum_frames_per_second and since_refresh > 1000 / minimum_frames_per_second:
+                raise RuntimeError("Below minimum frame rate")
+            target_ms = 1000 / target_frames_per_second
+            since_call = now - self._last_refresh_call
+            self._last_refresh_call = now
+            if since_call > target_ms:
+                _hostenv.count("display_refresh_skipped")
+                return False
+            wait = target_ms - (since_refresh % target_ms)
+            _hostenv.count("display_refresh_wait_ms", wait)
+            time.sleep(wait / 1000)
+            now += wait
+        self._first_manual_refresh = False
+        self._last_refresh = now
+        _hostenv.count("display_refresh")
+        if self.framebuffer is not None and self.root_group is not None:
+            self.framebuffer.render(self.root_group)
+        return True
@@ -0,0 +1,7 @@
+from collections import namedtuple
+
+# Host stand-in for the CircuitPython fontio module
+
+Glyph = namedtuple(
+    "Glyph", ["bitmap", "tile_index", "width", "height", "dx", "dy", "shift_x", "shift_y"]
+)
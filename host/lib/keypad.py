@@ -0,0 +1,39 @@
+import _hostenv
+
+# Host stand-in for CircuitPython's keypad, key presses are injected via _hostenv
+
+
+class Event:
+    def __init__(self, key_number=0, pressed=True):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.released = not pressed
+
+
+class EventQueue:
+    def __init__(self):
+        self._events = []
+
+    def get(self):
+        if _hostenv.key_events:
+            key_number, pressed = _hostenv.key_events.pop(0)
+            return Event(key_number, pressed)
+        return None
+
+    def clear(self):
+        _hostenv.key_events.clear()
+
+
+class Keys:
+    def __init__(self, pins, *, value_when_pressed, pull=True):
+        self.pins = pins
+        self.events = EventQueue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
+
+    def deinit(self):
+        pass
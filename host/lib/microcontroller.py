@@ -0,0 +1,13 @@
+# Host stand-in for CircuitPython's microcontroller
+
+
+class _CPU:
+    temperature = 25.0
+    frequency = 120000000
+
+
+cpu = _CPU()
+
+
+def reset():
+    raise SystemExit("microcontroller.reset()")
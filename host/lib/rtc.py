@@ -0,0 +1,20 @@
+import calendar
+import time
+
+import _hostenv
+
+# Host stand-in for CircuitPython's rtc, driven by the host clock
+
+
+class RTC:
+    @property
+    def datetime(self):
+        return time.gmtime(int(_hostenv.clock.now()))
+
+    @datetime.setter
+    def datetime(self, value):
+        _hostenv.clock.set_now(calendar.timegm(tuple(value)[:6] + (0, 0, 0)))
+
+
+def set_time_source(rtc):
+    pass
@@ -0,0 +1,15 @@
+import time
+
+# Host stand-in for CircuitPython's supervisor
+
+
+def disable_autoreload():
+    pass
+
+
+def reload():
+    raise SystemExit("supervisor.reload()")
+
+
+def ticks_ms():
+    return int(time.monotonic() * 1000) & ((1 << 29) - 1)
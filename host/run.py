@@ -0,0 +1,64 @@
+import argparse
+import os
+import runpy
+import signal
+
+from host import runtime
+from host.timeserver import TimeServer
+
+# Runs the full application (code.py -> app/__init__.py) on the host for a
+# fixed wall time: python -m host.run mario --seconds 10 --snapshot frame.ppm
+
+
+def run_app(theme, seconds=10, width=64, height=32, snapshot=None):
+    timeserver = TimeServer().__enter__()
+    hostenv = runtime.setup(
+        secrets=dict(
+            matrix_width=width, matrix_height=height, ntp_api=timeserver.url, theme=theme
+        ),
+        app_package=False,
+    )
+
+    def stop(signum, frame):
+        raise SystemExit("host: run time elapsed")
+
+    signal.signal(signal.SIGALRM, stop)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        runpy.run_path(os.path.join(runtime.SRC_DIR, "code.py"), run_name="__main__")
+    except SystemExit as error:
+        print(f"HOST EXIT: {error}")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        timeserver.__exit__()
+    if snapshot and hostenv.displays:
+        from host.framebuffer import Framebuffer
+
+        display = hostenv.displays[-1]
+        framebuffer = Framebuffer(display.width, display.height)
+        framebuffer.render(display.root_group)
+        framebuffer.to_ppm(snapshot)
+    return dict(hostenv.counters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the application on the host")
+    parser.add_argument("theme", nargs="?", default="mario", choices=runtime.THEMES)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--height", type=int, default=32)
+    parser.add_argument("--snapshot", help="write the last shown frame to a PPM file")
+    args = parser.parse_args()
+    counters = run_app(
+        args.theme,
+        seconds=args.seconds,
+        width=args.width,
+        height=args.height,
+        snapshot=args.snapshot,
+    )
+    for key, value in sorted(counters.items()):
+        print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
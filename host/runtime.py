@@ -0,0 +1,108 @@
+import builtins
+import gc
+import importlib
+import os
+import sys
+import types
+
+# Host runtime: puts the stand-in CircuitPython modules on sys.path so that
+# app/ and themes/ can be imported and profiled on a Linux box
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+LIB_DIR = os.path.join(HOST_DIR, "lib")
+ROOT_DIR = os.path.dirname(HOST_DIR)
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+THEMES_DIR = os.path.join(SRC_DIR, "themes")
+
+HEAP_SIZE = 192 * 1024
+HEAP_FREE = 100 * 1024
+
+DEFAULT_SECRETS = {
+    "debug": False,
+    "ssid": "host",
+    "password": "host",
+    "mqtt_broker": "localhost",
+    "mqtt_port": 1883,
+    "mqtt_user": "host",
+    "mqtt_password": "host",
+    "matrix_width": 64,
+    "matrix_height": 32,
+    "matrix_bit_depth": 4,
+    "matrix_color_order": "RGB",
+}
+
+_real_open = builtins.open
+_real_stat = os.stat
+_real_listdir = os.listdir
+
+THEMES = sorted(
+    name[:-3] for name in os.listdir(THEMES_DIR) if name.endswith(".py")
+)
+
+
+def setup(secrets=None, manual_clock=False, epoch=None, app_package=True):
+    for path in (SRC_DIR, LIB_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    # stdlib has its own "secrets" module, replace it with the device config
+    config = dict(DEFAULT_SECRETS)
+    config.update(secrets or {})
+    module = types.ModuleType("secrets")
+    module.secrets = config
+    sys.modules["secrets"] = module
+    # app/__init__.py is the application itself, register the package without
+    # executing it so that app.* modules can be imported on their own
+    if app_package and "app" not in sys.modules:
+        package = types.ModuleType("app")
+        package.__path__ = [os.path.join(SRC_DIR, "app")]
+        sys.modules["app"] = package
+    # CircuitPython only gc API
+    gc.mem_free = lambda: HEAP_FREE
+    gc.mem_alloc = lambda: HEAP_SIZE - HEAP_FREE
+    import _hostenv
+
+    _hostenv.clock = _hostenv.Clock(epoch=epoch, manual=manual_clock)
+    _hostenv.clock.install()
+    _hostenv.screen = (config["matrix_width"], config["matrix_height"])
+    # device paths read directly by app code (e.g. "/bitocra7.gla")
+    builtins.open = _open
+    os.stat = lambda path, *args, **kwargs: _real_stat(_device_path(path), *args, **kwargs)
+    os.listdir = lambda path=".": _real_listdir(_device_path(path))
+    return _hostenv
+
+
+def _open(file, mode="r", *args, **kwargs):
+    if "r" in mode and "+" not in mode:
+        file = _device_path(file)
+    return _real_open(file, mode, *args, **kwargs)
+
+
+def _device_path(path):
+    if isinstance(path, str) and path.startswith("/"):
+        try:
+            _real_stat(path)
+        except OSError:
+            import _hostenv
+
+            return _hostenv.resolve(path)
+    return path
+
+
+def load_theme(name):
+    # themes are installed side by side (src/themes), like on the device
+    if name not in THEMES:
+        raise ValueError(f"unknown theme: {name} (available: {', '.join(THEMES)})")
+    sys.modules.pop(f"themes.{name}", None)
+    return importlib.import_module(f"themes.{name}")
+
+
+def build_hass(store, host_id="host0001"):
+    import adafruit_minimqtt.adafruit_minimqtt as MQTT
+    from app.integration import HASSManager, setup_entities
+
+    client = MQTT.MQTT(broker="localhost")
+    client.connect()
+    store["online_mqtt"] = True
+    hass = HASSManager(client, store, host_id)
+    setup_entities(hass)
+    return hass
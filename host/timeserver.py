@@ -0,0 +1,106 @@
+import json
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-ins for worldtimeapi.org and an SNTP server, with adjustable clock
+# offset, response delay and failure injection
+
+
+class TimeServer:
+    def __init__(self, offset=0.0, delay=0.0, fail=False):
+        self.offset = offset
+        self.delay = delay
+        self.fail = fail
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                if server.delay:
+                    time.sleep(server.delay)
+                if server.fail:
+                    self.send_error(503)
+                    return
+                now = time.time() + server.offset
+                stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+                body = json.dumps(
+                    dict(
+                        datetime=f"{stamp}.{int((now % 1) * 1000000):06d}+00:00",
+                        unixtime=int(now),
+                        utc_offset="+00:00",
+                    )
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}/api/timezone/Etc/UTC"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SNTPServer:
+    def __init__(self, offset=0.0, delay=0.0, fail=False):
+        self.offset = offset
+        self.delay = delay
+        self.fail = fail
+        self.requests = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.host, self.port = self.sock.getsockname()
+        self.running = False
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _timestamp(self):
+        now = time.time() + self.offset + 2208988800
+        return int(now), int((now % 1) * (1 << 32))
+
+    def _serve(self):
+        self.sock.settimeout(0.1)
+        while self.running:
+            try:
+                request, address = self.sock.recvfrom(48)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.requests += 1
+            received = self._timestamp()
+            if self.delay:
+                time.sleep(self.delay)
+            if self.fail:
+                continue
+            response = bytearray(48)
+            response[0] = 0x1C  # LI=0, VN=3, Mode=4 (server)
+            response[1] = 1  # stratum
+            struct.pack_into("!II", response, 32, *received)
+            struct.pack_into("!II", response, 40, *self._timestamp())
+            self.sock.sendto(response, address)
+
+    def __enter__(self):
+        self.running = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
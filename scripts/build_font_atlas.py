@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import argparse
+import struct
+
+# Converts a BDF font into the compact glyph atlas read by app.font:
+#
+#   "GLA1", cell width, cell height, dx, dy, ascent, descent, glyph count (<4sBBbbBBH)
+#   per glyph: code point, advance (<HB)
+#   per glyph: cell height rows of ceil(cell width / 8) bytes, MSB first
+#
+# Every glyph is placed on the font bounding box cell so the device can keep
+# them all as tiles of a single bitmap.
+#
+#   scripts/build_font_atlas.py src/bitocra7.bdf src/bitocra7.gla
+
+MAGIC = b"GLA1"
+
+
+def parse_bdf(path):
+    glyphs = []
+    font = dict(ascent=0, descent=0)
+    glyph = None
+    with open(path, "r") as f:
+        for line in f:
+            key, _, value = line.strip().partition(" ")
+            if key == "FONTBOUNDINGBOX":
+                font["bbox"] = tuple(int(v) for v in value.split())
+            elif key == "FONT_ASCENT":
+                font["ascent"] = int(value)
+            elif key == "FONT_DESCENT":
+                font["descent"] = int(value)
+            elif key == "STARTCHAR":
+                glyph = dict(rows=None)
+            elif key == "ENCODING":
+                glyph["code_point"] = int(value.split()[0])
+            elif key == "DWIDTH":
+                glyph["shift_x"] = int(value.split()[0])
+            elif key == "BBX":
+                glyph["bbx"] = tuple(int(v) for v in value.split())
+            elif key == "BITMAP":
+                glyph["rows"] = []
+            elif key == "ENDCHAR":
+                if glyph["code_point"] >= 0:
+                    glyphs.append(glyph)
+                glyph = None
+            elif glyph is not None and glyph["rows"] is not None:
+                glyph["rows"].append(key)
+    return font, glyphs
+
+
+def build_atlas(font, glyphs, charset=None):
+    cell_w, cell_h, cell_dx, cell_dy = font["bbox"]
+    row_bytes = (cell_w + 7) // 8
+    if charset is not None:
+        code_points = set(ord(c) for c in charset)
+        glyphs = [g for g in glyphs if g["code_point"] in code_points]
+    glyphs = sorted(glyphs, key=lambda g: g["code_point"])
+    header = struct.pack(
+        "<4sBBbbBBH",
+        MAGIC,
+        cell_w,
+        cell_h,
+        cell_dx,
+        cell_dy,
+        font["ascent"],
+        font["descent"],
+        len(glyphs),
+    )
+    index = b"".join(struct.pack("<HB", g["code_point"], g["shift_x"]) for g in glyphs)
+    pixels = bytearray()
+    for glyph in glyphs:
+        width, height, dx, dy = glyph["bbx"]
+        cell = [0] * cell_h
+        # glyph box relative to the cell, rows counted from the cell top
+        top = (cell_h + cell_dy) - (height + dy)
+        for y, row in enumerate(glyph["rows"]):
+            bits = int(row, 16)
+            total = len(row) * 4
+            for x in range(width):
+                if bits & (1 << (total - 1 - x)):
+                    cx = x + dx - cell_dx
+                    cy = y + top
+                    if 0 <= cx < cell_w and 0 <= cy < cell_h:
+                        cell[cy] |= 1 << (row_bytes * 8 - 1 - cx)
+        for value in cell:
+            pixels.extend(value.to_bytes(row_bytes, "big"))
+    return header + index + bytes(pixels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a compact glyph atlas from a BDF font")
+    parser.add_argument("bdf")
+    parser.add_argument("output")
+    parser.add_argument("--charset", help="only include these characters")
+    args = parser.parse_args()
+    font, glyphs = parse_bdf(args.bdf)
+    atlas = build_atlas(font, glyphs, args.charset)
+    with open(args.output, "wb") as f:
+        f.write(atlas)
+    print(f"{args.output}: {len(atlas)} bytes, {atlas[10] | atlas[11] << 8} glyphs")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,32 @@
 
 declare -r script_dir="$(cd -- "$(dirname -- "${BASH_SOURCE[0]}")" &> /dev/null && pwd)"
 declare -r base_dir="${script_dir}/.."
-declare -r theme="${1:-mario}"
-declare -r dest_dir="${2:-/media/${USER}/CIRCUITPY}"
+
+# all themes are installed, a theme name as the first argument is still
+# accepted for compatibility but the boot theme is set in secrets.py
+if [[ -n "${1}" && -f "${base_dir}/src/themes/${1}.py" ]]; then
+    echo "Note: all themes are installed, set \"theme\": \"${1}\" in secrets.py to boot into it"
+    shift
+fi
+declare -r dest_dir="${1:-/media/${USER}/CIRCUITPY}"
 
 
 source "${base_dir}/venv/bin/activate"
 
 echo "Deploying to Matrix Portal..."
 echo
-echo "Theme:          ${theme} (theme_${theme}.py)"
+echo "Themes:         $(cd "${base_dir}/src/themes" && ls *.py | sed 's/\.py$//' | xargs)"
 echo "Source Path:    ${base_dir}"
 echo "Destination:    ${dest_dir}"
 echo
 
 echo "Syncronising project source to destination device (${dest_dir})..."
 echo
-rsync -av --inplace --exclude "theme_*.py" "${base_dir}/src/" "${dest_dir}/"
-cp -v "${base_dir}/src/themes/${theme}.py" "${dest_dir}/theme.py"
-cp -v "${base_dir}/src/themes/${theme}.bmp" "${dest_dir}/theme.bmp"
+rsync -av --inplace --exclude "__pycache__" "${base_dir}/src/" "${dest_dir}/"
+# single theme installs from older versions
+rm -fv "${dest_dir}/theme.py" "${dest_dir}/theme.bmp"
 sync
 echo
 
 echo "DONE"
-echo
\ No newline at end of file
+echo
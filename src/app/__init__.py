@@ -3,41 +3,57 @@ import board
 from busio import I2C
 import gc
 import time
+from adafruit_ticks import ticks_ms, ticks_diff
 import adafruit_esp32spi.adafruit_esp32spi_socket as socket
 import adafruit_requests as requests
 from adafruit_matrixportal.matrix import Matrix
 from adafruit_matrixportal.network import Network
-from adafruit_bitmap_font import bitmap_font
 from adafruit_lis3dh import LIS3DH_I2C
 
 from app.constants import (
     DEBUG,
     BRIGHTNESS,
+    NTP_ENABLE,
     NTP_INTERVAL,
+    NTP_SERVER,
+    NTP_TIMEZONE,
+    NTP_LOCAL_OFFSET,
+    NTP_BEACON,
     MATRIX_WIDTH,
     MATRIX_HEIGHT,
     MATRIX_BIT_DEPTH,
     MATRIX_COLOR_ORDER,
     MQTT_PREFIX,
-    ASYNCIO_LOOP_DELAY,
+    FRAME_RATE,
+    FRAME_RATE_OVERRIDE,
+    IDLE_FRAME_RATE,
+    FONT_GLYPHS,
+    DISPLAY_AUTO_REFRESH,
+    THEME,
 )
 
 from app.storage import store
-from app.display import build_splash_group, BlankGroup
+from app.font import load_font
+from app.display import build_splash_group, BlankGroup, SceneManager, palette_brightness
+from app.scheduler import FrameScheduler
+from app.profiler import profiler, profiler_poll
+from app.memory import memory
+from app.themes import ThemeManager
 from app.integration import (
     mqtt_connect,
     mqtt_poll,
+    log_drain,
     mqtt_ping,
-    network_time_update,
-    network_time_poll,
     gpio_poll,
     HASSManager,
+    setup_entities,
 )
-from app.utils import logger, matrix_rotation, get_new_epochs
-from theme import Theme
+from app.clock import frame_clock
+from app.timesync import TimeSync, TimeBeacon, HTTPTimeSource, SNTPTimeSource
+from app.utils import logger, warning, matrix_rotation
 
 logger(
-    f"debug={DEBUG} brightness={BRIGHTNESS} ntp_interval={NTP_INTERVAL} mqtt_prefix={MQTT_PREFIX}"
+    f"debug={DEBUG} brightness={BRIGHTNESS} ntp_interval={NTP_INTERVAL} time_beacon={NTP_BEACON} mqtt_prefix={MQTT_PREFIX}"
 )
 logger(
     f"matrix_width={MATRIX_WIDTH} matrix_height={MATRIX_HEIGHT} matrix_bit_depth={MATRIX_BIT_DEPTH} matrix_color_order={MATRIX_COLOR_ORDER}"
@@ -46,10 +62,15 @@ logger(
 
 # LOCAL VARS
 client = None
+idle_since = None
+theme_version = None
 
 # STATIC RESOURCES
 logger("loading static resources")
-font_bitocra = bitmap_font.load_font("/bitocra7.bdf")
+font_bitocra = load_font(
+    "/bitocra7.bdf",
+    None if FONT_GLYPHS is None else FONT_GLYPHS + "loading...reconnecting...",
+)
 gc.collect()
 
 # RGB MATRIX
@@ -74,9 +95,24 @@ gc.collect()
 del accelerometer
 
 # THEME
-theme = Theme(width=MATRIX_WIDTH, height=MATRIX_HEIGHT, font=font_bitocra)
+themes = ThemeManager(MATRIX_WIDTH, MATRIX_HEIGHT, font_bitocra)
+theme = themes.load(THEME)
 
-display.show(splash)
+blank = BlankGroup()
+scenes = SceneManager(display, splash, theme.group)
+scenes.set_status("loading...")
+
+profiler.instrument(theme)
+
+# FRAME SCHEDULER
+def theme_frame_rate(theme):
+    if FRAME_RATE_OVERRIDE:
+        return FRAME_RATE
+    return getattr(theme, "frame_rate", FRAME_RATE)
+
+scheduler = FrameScheduler(theme_frame_rate(theme))
+store["frame_rate"] = scheduler.frame_rate
+logger(f"frame scheduler: frame_rate={scheduler.frame_rate}")
 
 # NETWORKING
 logger("configuring networking")
@@ -89,7 +125,18 @@ logger(f"network: host_id={host_id}")
 gc.collect()
 
 # NETWORK TIME
-network_time_update(network)
+time_sources = [HTTPTimeSource(socket)]
+if NTP_SERVER and not NTP_LOCAL_OFFSET and NTP_TIMEZONE != "Europe/London":
+    # utc_offset/dst default to London time, which would silently be wrong
+    warning("time sync: sntp disabled, set utc_offset/dst for timezone=%s", NTP_TIMEZONE)
+elif NTP_SERVER:
+    time_sources.insert(0, SNTPTimeSource(socket))
+timesync = TimeSync(time_sources)
+beacon = TimeBeacon(timesync)
+# beacon subscribers take their time from MQTT only
+network_time = NTP_ENABLE and NTP_BEACON != "subscribe"
+if network_time:
+    asyncio.run(timesync.sync())
 gc.collect()
 
 # MQTT
@@ -99,16 +146,13 @@ gc.collect()
 
 # HOME ASSISTANT
 hass = HASSManager(client, store, host_id)
-light_rgb_options = dict(
-    color_mode=True, supported_color_modes=["rgb"], brightness=True
-)
-hass.add_entity("power", "Power", "switch", {}, dict(state="ON"))
-hass.add_entity("date_rgb", "Date", "light", light_rgb_options, dict(state="ON", color_mode="RGB", color=dict(r=0xff,g=0x00, b=0xff), brightness=63))
-hass.add_entity("time_rgb", "Time", "light", light_rgb_options, dict(state="ON", color_mode="RGB", color=dict(r=0xff,g=0xff, b=0xff), brightness=63))
-hass.add_entity("time_seconds", "Show Seconds", "switch", {}, dict(state="OFF"))
-hass.add_entity("a_rgb", "Custom RGB A", "light", light_rgb_options, dict(state="ON", color_mode="RGB", color=dict(r=0x33,g=0xff, b=0x33), brightness=63))
+setup_entities(hass, themes.names, themes.name)
+theme_version = store["entities"]["theme"].version
+if NTP_BEACON == "subscribe":
+    hass.add_handler(beacon.topic, beacon.receive)
 
-gc.collect()
+# MEMORY
+memory.setup()
 
 # APP STARTUP
 def run():
@@ -131,32 +175,100 @@ async def main():
     asyncio.create_task(gpio_poll())
     asyncio.create_task(mqtt_ping(client, hass, store))
     asyncio.create_task(mqtt_poll(client, hass))
-    asyncio.create_task(network_time_poll(network))
-    while True:
-        asyncio.create_task(tick())
-                
-        await asyncio.sleep(ASYNCIO_LOOP_DELAY)
+    asyncio.create_task(log_drain(client, store, f"{MQTT_PREFIX}/{host_id}/log"))
+    if network_time:
+        asyncio.create_task(timesync.run())
+    if NTP_BEACON == "publish":
+        asyncio.create_task(beacon.run(client))
+    if profiler.enabled:
+        asyncio.create_task(profiler_poll(hass))
+    if DISPLAY_AUTO_REFRESH:
+        await scheduler.run(tick, memory.idle)
+    else:
+        # refresh between ticks only, never halfway through a theme update
+        display.auto_refresh = False
+        await scheduler.run(tick, memory.idle, display)
 
 
 # EVENT LOOP TICK HANDLER
 async def tick():
     global store
-    store["ts_last"], epochs = get_new_epochs(store["ts_last"])
+    start = tick_start = profiler.start()
+    epochs = frame_clock.update()
+    store["ticks"] = ticks_ms()
+    profiler.stop("epochs", start)
     frame = store["frame"]
     entities = store["entities"]
     online = store["online_mqtt"]
-    if online:
-        display.show(
-            theme.group if entities["power"].state["state"] == "ON" else BlankGroup()
-        )
-    else:
-        splash[0].text = "reconnecting..."
-        display.show(splash)
+    start = profiler.start()
+    scenes.set_status(None if online else "reconnecting...")
+    profiler.stop("show", start)
+    if entities["theme"].version != theme_version:
+        set_theme(entities["theme"])
+    idle = online and not entities["power"].on
+    if idle != (idle_since is not None):
+        set_idle(idle)
     if frame % 100 == 0:
-        logger(f"tick: frame={frame} online={online} entity_count={len(entities)}")
+        logger(f"tick: frame={frame} online={online} idle={idle} entity_count={len(entities)} {scheduler} {memory}")
+    if idle:
+        store["frame"] += 1
+        return
+    palette_brightness.tick(entities["brightness"], scheduler.frame_rate)
+    start = profiler.start()
     theme.tick(store, epochs)
+    profiler.stop("theme", start)
     store["frame"] += 1
-    
+    profiler.stop("tick", tick_start)
+
+
+def set_idle(idle):
+    # power off: blank once, stop ticking the theme and drop to a heartbeat
+    global idle_since
+    if idle:
+        idle_since = ticks_ms()
+        frame_clock.suspended = True
+        scenes.set_scene(blank)
+        scheduler.set_frame_rate(IDLE_FRAME_RATE)
+        logger("idle: theme suspended")
+    else:
+        elapsed = ticks_diff(ticks_ms(), idle_since)
+        idle_since = None
+        scenes.set_scene(theme.group)
+        scheduler.set_frame_rate(theme_frame_rate(theme))
+        store["frame_rate"] = scheduler.frame_rate
+        frame_clock.suspended = False
+        frame_clock.notify()
+        if hasattr(theme, "resume"):
+            theme.resume(elapsed)
+        logger(f"idle: theme resumed elapsed_ms={elapsed}")
+
+
+def set_theme(entity):
+    # runs between frames, nothing may keep the old theme alive while it is
+    # torn down: blank the scene and drop the global reference first
+    global theme, theme_version
+    theme_version = entity.version
+    name = entity.state.get("state")
+    if name == themes.name:
+        return
+    previous = themes.name
+    scenes.set_scene(blank)
+    scenes.set_status("loading...")
+    theme = None
+    try:
+        theme = themes.load(name)
+    except Exception as error:
+        warning("theme: load failed name=%s error=%s", name, error)
+        theme = themes.fallback(previous, name)
+        entity.update(dict(state=themes.name or previous))
+        theme_version = entity.version
+    profiler.instrument(theme)
+    if idle_since is None:
+        scenes.set_scene(theme.group)
+        scheduler.set_frame_rate(theme_frame_rate(theme))
+        store["frame_rate"] = scheduler.frame_rate
+        # the new widgets only hear about the date on the next epoch
+        frame_clock.notify()
 
 
 # STARTUP
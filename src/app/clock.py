@@ -0,0 +1,112 @@
+import time
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+from rtc import RTC
+
+from app.constants import NTP_SLEW_RATE_MS
+from app.utils import logger, debug
+
+# epochs list indices, hour/minute/second keep the order themes already use
+EPOCH_HOUR = 0
+EPOCH_MINUTE = 1
+EPOCH_SECOND = 2
+EPOCH_DAY = 3
+
+
+class FrameClock:
+    # Reads the RTC once when anchored (boot / network time sync) and derives
+    # the wall time of every frame from ticks_ms. The anchor is moved forward
+    # in whole seconds so it never drifts or overflows the ticks period.
+    def __init__(self):
+        self.anchor_ts = None
+        self.anchor_ticks = 0
+        self.slew_ms = 0
+        self.ts = None
+        self.now = None
+        self.epochs = [False, False, False, False]
+        self._subscribers = ([], [], [], [])
+        # epochs are still computed while suspended, subscribers are not called
+        self.suspended = False
+
+    def anchor(self):
+        self.anchor_ts = int(time.mktime(RTC().datetime))
+        self.anchor_ticks = ticks_ms()
+        logger(f"frame clock: anchored ts={self.anchor_ts}")
+
+    def set_time(self, ts, ms=0):
+        # step to a known wall time, ms is the sub-second part of ts
+        self.anchor_ts = ts
+        self.anchor_ticks = ticks_add(ticks_ms(), -ms)
+        self.slew_ms = 0
+        RTC().datetime = time.localtime(ts)
+        logger(f"frame clock: set ts={ts} ms={ms}")
+
+    def slew(self, offset_ms):
+        # converge on the wall time gradually instead of jumping
+        self.slew_ms = offset_ms
+
+    def time_ms(self):
+        if self.anchor_ts is None:
+            self.anchor()
+        return self.anchor_ts * 1000 + ticks_diff(ticks_ms(), self.anchor_ticks)
+
+    def subscribe(self, epoch, callback):
+        self._subscribers[epoch].append(callback)
+
+    def unsubscribe(self, callback):
+        for subscribers in self._subscribers:
+            while callback in subscribers:
+                subscribers.remove(callback)
+
+    def checkpoint(self):
+        return [len(subscribers) for subscribers in self._subscribers]
+
+    def rollback(self, checkpoint):
+        # drop everything subscribed since the checkpoint (e.g. a theme)
+        for subscribers, count in zip(self._subscribers, checkpoint):
+            del subscribers[count:]
+
+    def update(self):
+        if self.anchor_ts is None:
+            self.anchor()
+        epochs = self.epochs
+        elapsed = ticks_diff(ticks_ms(), self.anchor_ticks) // 1000
+        if elapsed > 0:
+            step = 0
+            if self.slew_ms:
+                limit = elapsed * NTP_SLEW_RATE_MS
+                step = max(-limit, min(limit, self.slew_ms))
+                self.slew_ms -= step
+            self.anchor_ts += elapsed
+            self.anchor_ticks = ticks_add(self.anchor_ticks, elapsed * 1000 - step)
+        if self.anchor_ts == self.ts:
+            epochs[0] = epochs[1] = epochs[2] = epochs[3] = False
+            return epochs
+        last = self.now
+        now = self.now = time.localtime(self.anchor_ts)
+        self.ts = self.anchor_ts
+        epochs[EPOCH_SECOND] = True
+        epochs[EPOCH_MINUTE] = last is None or now.tm_min != last.tm_min
+        epochs[EPOCH_HOUR] = last is None or now.tm_hour != last.tm_hour
+        epochs[EPOCH_DAY] = last is None or now.tm_mday != last.tm_mday
+        if epochs[EPOCH_MINUTE]:
+            debug("epoch: minute")
+            if epochs[EPOCH_HOUR]:
+                debug("epoch: hour")
+        if not self.suspended:
+            for epoch in (EPOCH_DAY, EPOCH_HOUR, EPOCH_MINUTE, EPOCH_SECOND):
+                if epochs[epoch]:
+                    for callback in self._subscribers[epoch]:
+                        callback(now)
+        return epochs
+
+    def notify(self):
+        # call every subscriber once with the current time, e.g. after a
+        # suspend or for subscribers that missed the last epochs
+        if self.now is None:
+            return
+        for epoch in (EPOCH_DAY, EPOCH_HOUR, EPOCH_MINUTE, EPOCH_SECOND):
+            for callback in self._subscribers[epoch]:
+                callback(self.now)
+
+
+frame_clock = FrameClock()
@@ -2,21 +2,60 @@ from secrets import secrets
 
 # CONFIG / SECRETS
 DEBUG = secrets.get("debug", False)
+LOG_LEVEL = secrets.get("log_level", "debug" if DEBUG else "info")
+LOG_SERIAL = secrets.get("log_serial", True)
+LOG_MQTT = secrets.get("log_mqtt", False)
 BRIGHTNESS = secrets.get("brightness", 0.2)
 NTP_TIMEZONE = secrets.get("timezone", "Europe/London")
+NTP_ENABLE = secrets.get("ntp_enable", True)
 NTP_INTERVAL = secrets.get("ntp_interval", 60 * 60 * 3)
+# SNTP only returns UTC, it is used by default once the local offset is set
+NTP_LOCAL_OFFSET = "utc_offset" in secrets or "dst" in secrets
+NTP_SERVER = secrets.get("ntp_server", "pool.ntp.org" if NTP_LOCAL_OFFSET else None)
+NTP_UTC_OFFSET = secrets.get("utc_offset", 0)
+# London rules by default, a bare utc_offset means no summer time until dst is set
+NTP_DST = secrets.get("dst", None if "utc_offset" in secrets else "eu")
+NTP_API = secrets.get("ntp_api", f"http://worldtimeapi.org/api/timezone/{NTP_TIMEZONE}")
+NTP_BEACON = secrets.get("time_beacon", None)
+NTP_BEACON_INTERVAL = secrets.get("time_beacon_interval", 60)
 MATRIX_WIDTH = secrets.get("matrix_width", 64)
 MATRIX_HEIGHT = secrets.get("matrix_height", 32)
 MATRIX_BIT_DEPTH = secrets.get("matrix_bit_depth", 4)
 MATRIX_COLOR_ORDER = secrets.get("matrix_color_order", "RGB")
 MQTT_PREFIX = secrets.get("mqtt_prefix", "ledclock")
+FRAME_RATE = secrets.get("frame_rate", 30)
+# an explicit frame_rate wins over the rate a theme declares
+FRAME_RATE_OVERRIDE = "frame_rate" in secrets
+FONT_GLYPHS = secrets.get("font_glyphs", "0123456789:/ ")
+CLOCK_WIDGET = secrets.get("clock_widget", "atlas")
+BITMAP_IN_RAM = secrets.get("bitmap_in_ram", False)
+THEME = secrets.get("theme", "mario")
+DISPLAY_AUTO_REFRESH = secrets.get("auto_refresh", True)
+NTP_BEACON_TOPIC = f"{MQTT_PREFIX}/time"
+PROFILER_ENABLE = secrets.get("profiler", False)
+PROFILER_INTERVAL = secrets.get("profiler_interval", 60)
+GC_WATERMARK = secrets.get("gc_watermark", 16 * 1024)
+GC_IDLE_WATERMARK = secrets.get("gc_idle_watermark", 48 * 1024)
+GC_THRESHOLD = secrets.get("gc_threshold", None)
 
 # CONSTANTS
+THEMES_PATH = "/themes"
 _ASYNCIO_DELAY = 0.01
-ASYNCIO_LOOP_DELAY = _ASYNCIO_DELAY
 ASYNCIO_GPIO_POLL_DELAY = _ASYNCIO_DELAY
 ASYNCIO_MQTT_POLL_DELAY = _ASYNCIO_DELAY
 ASYNCIO_MQTT_PING_INTERVAL = 30
+NTP_TIMEOUT = 5
+NTP_RETRY_DELAY = 5
+NTP_SLEW_LIMIT_MS = 2000
+NTP_SLEW_RATE_MS = 50
+MQTT_QUEUE_SIZE = 32
+MQTT_DRAIN_BUDGET_MS = 8
+GC_IDLE_SLACK_MS = 10
+BRIGHTNESS_LEVELS = 31  # steps of 1/30, the usual 0.1, 0.2 .. secrets map exactly
+IDLE_FRAME_RATE = 2
+LOG_BUFFER_SIZE = 64
+LOG_DRAIN_INTERVAL = 1
+LOG_DRAIN_BATCH = 16
 
 # GPIO
 BUTTON_UP = 0
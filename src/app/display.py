@@ -1,16 +1,34 @@
 import asyncio
 import gc
+import random
+import struct
+from array import array
 
 from adafruit_display_text.label import Label as BaseLabel
-from displayio import OnDiskBitmap, TileGrid as BaseTileGrid, Group
-from cedargrove_palettefader.palettefader import PaletteFader
-from rtc import RTC
+from displayio import Bitmap, OnDiskBitmap, Palette, TileGrid as BaseTileGrid, Group
 
-from app.constants import BRIGHTNESS
-from app.utils import rgb_dict_to_hex
+from app.clock import frame_clock, EPOCH_SECOND, EPOCH_DAY
+from app.constants import (
+    BRIGHTNESS,
+    BRIGHTNESS_LEVELS,
+    CLOCK_WIDGET,
+    BITMAP_IN_RAM,
+    MATRIX_BIT_DEPTH,
+)
+from app.storage import store
+from app.utils import logger
 
 PALETTE_GAMMA = 1.0
 PALETTE_NORMALIZE = True
+DIGIT_ATLAS_CHARS = "0123456789:/"
+DIGIT_BLANK = len(DIGIT_ATLAS_CHARS)
+DIGIT_COLON = DIGIT_ATLAS_CHARS.index(":")
+DIGIT_SLASH = DIGIT_ATLAS_CHARS.index("/")
+ACTOR_NO_TARGET = -32768
+# smallest 8-bit channel value that survives RGB565 -> matrix bit depth
+MATRIX_MIN_CHANNEL = 0x100 >> MATRIX_BIT_DEPTH
+
+_digit_atlases = dict()
 
 
 class BlankGroup(Group):
@@ -56,8 +74,11 @@ class AnimatedTileGrid(TileGrid):
         self._animate_x_range = x_range
         self._animate_y_range = y_range
         self._animate_async_delay = async_delay
+        # sub-pixel positions, the TileGrid only sees whole pixel changes
         self._animate_x = float(x)
         self._animate_y = float(y)
+        self._animate_shown_x = x
+        self._animate_shown_y = y
         self._animate_x_target = None
         self._animate_y_target = None
         self._animate_x_velocity = 0
@@ -89,6 +110,13 @@ class AnimatedTileGrid(TileGrid):
         self._animate_x_target = None
         self._animate_y_target = None
 
+    def fast_forward(self):
+        # skip the rest of the walk: snap to the target and stop, used when a
+        # theme resumes after being idle
+        self.set_position(self._animate_x_target, self._animate_y_target)
+        self.stop()
+        self._update_tilegrid()
+
     async def start(self):
         if isinstance(self._animate_async_delay, float):
             while True:
@@ -123,8 +151,339 @@ class AnimatedTileGrid(TileGrid):
         self._animate_y += self._animate_y_velocity
 
     def _update_tilegrid(self):
-        self.x = int(self._animate_x)
-        self.y = int(self._animate_y)
+        x = int(self._animate_x)
+        if x != self._animate_shown_x:
+            self.x = self._animate_shown_x = x
+        y = int(self._animate_y)
+        if y != self._animate_shown_y:
+            self.y = self._animate_shown_y = y
+
+
+class AnimationClip:
+    # Tile cycle declared once and expanded to one table entry per frame so
+    # playback is a lookup. With frame_rate set the clip plays by time (frames
+    # authored at that rate) and keeps its speed when frames are dropped,
+    # otherwise it follows the frame counter. flip=None leaves flip_x to the
+    # caller, flip_every alternates it every n frames.
+    def __init__(
+        self,
+        start,
+        length=1,
+        frames_per_tile=1,
+        flip=None,
+        flip_every=None,
+        loop=True,
+        frame_rate=None,
+    ):
+        frames = length * frames_per_tile
+        if flip_every:
+            while frames % (flip_every * 2):
+                frames += length * frames_per_tile
+        self.tiles = array("B", [start + (i // frames_per_tile) % length for i in range(frames)])
+        if flip_every:
+            self.flips = bytearray([(i // flip_every) % 2 == 0 for i in range(frames)])
+        elif flip is not None:
+            self.flips = bytearray([flip] * frames)
+        else:
+            self.flips = None
+        self.length = frames
+        self.loop = loop
+        self.frame_rate = frame_rate
+
+    def now(self, store):
+        # position of the clip clock, in clip frames
+        if self.frame_rate:
+            return store["ticks"] * self.frame_rate // 1000
+        return store["frame"]
+
+    def index(self, store, start=0):
+        elapsed = self.now(store) - start
+        if 0 <= elapsed < self.length:
+            return elapsed
+        return elapsed % self.length if self.loop else self.length - 1
+
+
+class ActorPool(Group):
+    # Many single tile sprites walking one pixel per frame towards random
+    # targets. State lives in parallel arrays advanced in one loop per frame
+    # and only TileGrid x/y/tile/flip values that changed are written back.
+    # Each actor shows its walk clip while moving and its still clip otherwise,
+    # looping clips play in a shared phase so tile and flip are looked up
+    # once per clip per frame.
+    def __init__(self, bitmap, pixel_shader, tile_width, tile_height, capacity):
+        super().__init__()
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.count = 0
+        self.grids = []
+        self.clips = []
+        self.clip_tile = bytearray()
+        self.clip_flip = bytearray()
+        zeros = [0] * capacity
+        self.pos_x = array("h", zeros)
+        self.pos_y = array("h", zeros)
+        self.x_target = array("h", zeros)
+        self.y_target = array("h", zeros)
+        self.x_min = array("h", zeros)
+        self.x_max = array("h", zeros)
+        self.x_velocity = array("b", zeros)
+        self.y_velocity = array("b", zeros)
+        self.x_dir = array("b", zeros)
+        self.clip_walk = array("B", zeros)
+        self.clip_still = array("B", zeros)
+        self.retarget_every = array("H", zeros)
+        self.retarget_chance = array("B", zeros)
+        # last values written to each TileGrid
+        self.shown_x = array("h", zeros)
+        self.shown_y = array("h", zeros)
+        self.shown_tile = array("B", zeros)
+        self.shown_flip = array("B", zeros)
+        del zeros
+
+    def _clip_id(self, clip):
+        if not clip.loop:
+            raise ValueError("actor clips must loop")
+        if clip not in self.clips:
+            self.clips.append(clip)
+            self.clip_tile.append(0)
+            self.clip_flip.append(0)
+        return self.clips.index(clip)
+
+    def add(
+        self,
+        x,
+        y,
+        walk,
+        still,
+        x_range=None,
+        retarget_every=30,
+        retarget_chance=10,
+    ):
+        i = self.count
+        if i >= len(self.pos_x):
+            raise ValueError("actor pool full")
+        grid = BaseTileGrid(
+            self.bitmap,
+            pixel_shader=self.pixel_shader,
+            width=1,
+            height=1,
+            tile_width=self.tile_width,
+            tile_height=self.tile_height,
+            default_tile=still.tiles[0],
+            x=x,
+            y=y,
+        )
+        self.grids.append(grid)
+        self.append(grid)
+        self.pos_x[i] = self.shown_x[i] = x
+        self.pos_y[i] = self.shown_y[i] = y
+        self.x_target[i] = self.y_target[i] = ACTOR_NO_TARGET
+        if x_range is not None:
+            self.x_min[i], self.x_max[i] = x_range
+            self.retarget_chance[i] = retarget_chance
+        self.x_dir[i] = 1
+        self.clip_walk[i] = self._clip_id(walk)
+        self.clip_still[i] = self._clip_id(still)
+        self.shown_tile[i] = still.tiles[0]
+        self.retarget_every[i] = retarget_every
+        self.count = i + 1
+        return i
+
+    def set_target(self, i, x=None, y=None):
+        if x is not None:
+            self.x_target[i] = x
+        if y is not None:
+            self.y_target[i] = y
+
+    def tick(self, store):
+        frame = store["frame"]
+        randint = random.randint
+        grids = self.grids
+        clips = self.clips
+        clip_tile = self.clip_tile
+        clip_flip = self.clip_flip
+        for c in range(len(clips)):
+            clip = clips[c]
+            index = clip.index(store)
+            clip_tile[c] = clip.tiles[index]
+            # 2 faces the last horizontal direction
+            clip_flip[c] = 2 if clip.flips is None else clip.flips[index]
+        x = self.pos_x
+        y = self.pos_y
+        x_target = self.x_target
+        y_target = self.y_target
+        x_velocity = self.x_velocity
+        y_velocity = self.y_velocity
+        x_dir = self.x_dir
+        shown_x = self.shown_x
+        shown_y = self.shown_y
+        shown_tile = self.shown_tile
+        shown_flip = self.shown_flip
+        for i in range(self.count):
+            chance = self.retarget_chance[i]
+            if chance and frame % self.retarget_every[i] == 0 and randint(1, chance) == 1:
+                x_target[i] = randint(self.x_min[i], self.x_max[i])
+            # tile from last frame's velocity, then move
+            playing = self.clip_walk[i] if x_velocity[i] or y_velocity[i] else self.clip_still[i]
+            tile = clip_tile[playing]
+            flip = clip_flip[playing]
+            if flip == 2:
+                flip = x_dir[i] < 0
+            target = x_target[i]
+            if target != ACTOR_NO_TARGET:
+                if target == x[i]:
+                    x_velocity[i] = 0
+                    x_target[i] = ACTOR_NO_TARGET
+                else:
+                    x_velocity[i] = x_dir[i] = 1 if target > x[i] else -1
+            target = y_target[i]
+            if target != ACTOR_NO_TARGET:
+                if target == y[i]:
+                    y_velocity[i] = 0
+                    y_target[i] = ACTOR_NO_TARGET
+                else:
+                    y_velocity[i] = 1 if target > y[i] else -1
+            x[i] += x_velocity[i]
+            y[i] += y_velocity[i]
+            grid = grids[i]
+            if x[i] != shown_x[i]:
+                grid.x = shown_x[i] = x[i]
+            if y[i] != shown_y[i]:
+                grid.y = shown_y[i] = y[i]
+            if tile != shown_tile[i]:
+                grid[0] = shown_tile[i] = tile
+            if flip != shown_flip[i]:
+                grid.flip_x = flip
+                shown_flip[i] = flip
+
+    def fast_forward(self):
+        # every actor with a target lands on it and stands still, shown
+        # positions are written directly so no actor is drawn mid-walk
+        for i in range(self.count):
+            if self.x_target[i] != ACTOR_NO_TARGET:
+                self.pos_x[i] = self.x_target[i]
+            if self.y_target[i] != ACTOR_NO_TARGET:
+                self.pos_y[i] = self.y_target[i]
+            self.x_target[i] = self.y_target[i] = ACTOR_NO_TARGET
+            self.x_velocity[i] = self.y_velocity[i] = 0
+            self.grids[i].x = self.shown_x[i] = self.pos_x[i]
+            self.grids[i].y = self.shown_y[i] = self.pos_y[i]
+
+
+class ParallaxLayer(BaseTileGrid):
+    # Wrap-around background scrolled horizontally by offset. The bitmap is
+    # drawn once and shown as two tiles side by side; speed is in pixels per
+    # frame (fractions allowed, 8.8 fixed point, negative scrolls right) and
+    # x is only written when the whole pixel offset changes.
+    def __init__(self, bitmap, pixel_shader, speed=1, y=0):
+        super().__init__(
+            bitmap,
+            pixel_shader=pixel_shader,
+            width=2,
+            height=1,
+            tile_width=bitmap.width,
+            tile_height=bitmap.height,
+            default_tile=0,
+            x=0,
+            y=y,
+        )
+        self.period = bitmap.width << 8
+        self.speed = int(speed * 256)
+        self.offset = 0
+        self._x = 0
+
+    def tick(self, store):
+        self.offset = (self.offset + self.speed) % self.period
+        x = -(self.offset >> 8)
+        if x != self._x:
+            self.x = self._x = x
+
+
+def layer_palette(color):
+    # transparent background (0) and one colour (1) that follows the global
+    # brightness, colours are kept as given and dim no further than the
+    # matrix can show so faint layers don't drop out at low brightness
+    source = Palette(2)
+    source.make_transparent(0)
+    source[1] = color
+    return palette_brightness.add(source, normalize=False, visible=True)
+
+
+def starfield_bitmap(width, height, count, radius=0):
+    # two colour bitmap with count stars (index 1), radius > 0 draws discs,
+    # stars wrap horizontally so the bitmap tiles seamlessly
+    bitmap = Bitmap(width, height, 2)
+    for _ in range(count):
+        cx = random.randrange(width)
+        cy = random.randrange(height)
+        for dy in range(-radius, radius + 1):
+            y = cy + dy
+            if not 0 <= y < height:
+                continue
+            for dx in range(-radius, radius + 1):
+                if dx * dx + dy * dy <= radius * radius:
+                    bitmap[(cx + dx) % width, y] = 1
+    return bitmap
+
+
+class EntityColor:
+    # Colour and visibility of a light entity as seen by one consumer. HA
+    # transitions fade over frames, each frame is start + delta * k // frames
+    # per channel so the fade never overshoots, a new command restarts from
+    # the colour currently shown. update() is True only when something changed.
+    def __init__(self, dim=False):
+        self.dim = dim
+        self.version = None
+        self.color = None
+        self.on = False
+        self.target = 0
+        self.frames = 0
+        self.frame = 0
+        self.r = self.g = self.b = 0
+        self.dr = self.dg = self.db = 0
+
+    def update(self, entity, frame_rate):
+        if entity.version != self.version:
+            frames = entity.transition_frames(self.version, frame_rate)
+            self.version = entity.version
+            target = (entity.rgb_dim if self.dim else entity.rgb) if entity.on else 0
+            current = self.color if self.on and self.color is not None else 0
+            if frames > 1 and target != current:
+                self.target = target
+                self.frames = frames
+                self.frame = 0
+                self.r = current >> 16
+                self.g = (current >> 8) & 0xFF
+                self.b = current & 0xFF
+                self.dr = (target >> 16) - self.r
+                self.dg = ((target >> 8) & 0xFF) - self.g
+                self.db = (target & 0xFF) - self.b
+                # fading out stays visible until the last frame
+                self.on = True
+                self.color = current
+            else:
+                self.frames = 0
+                self.on = entity.on
+                self.color = target
+            return True
+        if not self.frames:
+            return False
+        self.frame += 1
+        frame = self.frame
+        frames = self.frames
+        if frame < frames:
+            self.color = (
+                ((self.r + self.dr * frame // frames) << 16)
+                | ((self.g + self.dg * frame // frames) << 8)
+                | (self.b + self.db * frame // frames)
+            )
+        else:
+            self.frames = 0
+            self.color = self.target
+            self.on = self.target != 0 or entity.on
+        return True
 
 
 class ClockLabel(Label):
@@ -133,25 +492,29 @@ class ClockLabel(Label):
         self.x = x
         self.y = y
         self.x_orig = x
+        self._color = EntityColor()
+        self._show_seconds = None
+        self._minute = None
+        frame_clock.subscribe(EPOCH_SECOND, self._on_second)
 
     def tick(self, store, epochs):
-        rgb = rgb_dict_to_hex(store["entities"]["time_rgb"].state["color"], store["entities"]["time_rgb"].state["brightness"])
-        visible = store["entities"]["time_rgb"].state["state"] == "ON"
-        show_seconds = store["entities"]["time_seconds"].state["state"] == "ON"
-        self.hidden = not visible
-        now = RTC().datetime
-        new_second = epochs[2]
-        if new_second:
-            if show_seconds:
-                self.x = self.x_orig
-                value = "{:0>2d}:{:0>2d}:{:0>2d}".format(
-                    now.tm_hour, now.tm_min, now.tm_sec
-                )
-            else:
-                self.x = self.x_orig + 12
-                value = "{:0>2d}:{:0>2d}".format(now.tm_hour, now.tm_min)
-            self.text = value
-            self.color = rgb
+        color = self._color
+        if color.update(store["entities"]["time_rgb"], store["frame_rate"]):
+            self.hidden = not color.on
+            self.color = color.color
+
+    def _on_second(self, now):
+        show_seconds = store["entities"]["time_seconds"].on
+        if show_seconds:
+            self.x = self.x_orig
+            self.text = "{:0>2d}:{:0>2d}:{:0>2d}".format(
+                now.tm_hour, now.tm_min, now.tm_sec
+            )
+        elif show_seconds != self._show_seconds or now.tm_min != self._minute:
+            self.x = self.x_orig + 12
+            self.text = "{:0>2d}:{:0>2d}".format(now.tm_hour, now.tm_min)
+        self._show_seconds = show_seconds
+        self._minute = now.tm_min
 
 
 class CalendarLabel(Label):
@@ -159,17 +522,163 @@ class CalendarLabel(Label):
         super().__init__(text="00/00", font=font, color=color)
         self.x = x
         self.y = y
+        self._color = EntityColor()
+        frame_clock.subscribe(EPOCH_DAY, self._on_day)
 
     def tick(self, store, epochs):
-        rgb = rgb_dict_to_hex(store["entities"]["date_rgb"].state["color"], store["entities"]["date_rgb"].state["brightness"])
-        visible = store["entities"]["date_rgb"].state["state"] == "ON"
-        self.hidden = not visible
-        now = RTC().datetime
-        new_hour = epochs[0]
-        if new_hour:
-            value = "{:0>2d}/{:0>2d}".format(now.tm_mday, now.tm_mon)
-            self.text = value
-        self.color = rgb
+        color = self._color
+        if color.update(store["entities"]["date_rgb"], store["frame_rate"]):
+            self.hidden = not color.on
+            self.color = color.color
+
+    def _on_day(self, now):
+        self.text = "{:0>2d}/{:0>2d}".format(now.tm_mday, now.tm_mon)
+
+
+def digit_atlas(font):
+    # digits, ":" and "/" copied once from the font into one bitmap of cell
+    # sized tiles, plus a blank tile, shared by every digit widget
+    atlas = _digit_atlases.get(id(font))
+    if atlas is not None:
+        return atlas
+    _, cell_h, cell_dx, cell_dy = font.get_bounding_box()
+    cell_w = font.get_glyph(ord("0")).shift_x
+    bitmap = Bitmap(cell_w * (DIGIT_BLANK + 1), cell_h, 2)
+    for tile, char in enumerate(DIGIT_ATLAS_CHARS):
+        glyph = font.get_glyph(ord(char))
+        if glyph is None:
+            continue
+        columns = glyph.bitmap.width // glyph.width
+        src_x = (glyph.tile_index % columns) * glyph.width
+        src_y = (glyph.tile_index // columns) * glyph.height
+        dst_x = tile * cell_w + glyph.dx - cell_dx
+        dst_y = cell_h + cell_dy - glyph.height - glyph.dy
+        for y in range(glyph.height):
+            for x in range(glyph.width):
+                if glyph.bitmap[src_x + x, src_y + y]:
+                    bitmap[dst_x + x, dst_y + y] = 1
+    # same vertical placement as a Label at the same y
+    y_offset = font.ascent // 2 - cell_h - cell_dy
+    atlas = _digit_atlases[id(font)] = (bitmap, cell_w, cell_h, y_offset)
+    return atlas
+
+
+class DigitGrid(BaseTileGrid):
+    # fixed width row of digit atlas tiles, only changed cells are written
+    def __init__(self, x, y, font, width, color=0x111111):
+        bitmap, cell_w, cell_h, y_offset = digit_atlas(font)
+        palette = Palette(2)
+        palette.make_transparent(0)
+        palette[1] = color
+        super().__init__(
+            bitmap,
+            pixel_shader=palette,
+            width=width,
+            height=1,
+            tile_width=cell_w,
+            tile_height=cell_h,
+            default_tile=DIGIT_BLANK,
+            x=x,
+            y=y + y_offset,
+        )
+        self.cell_width = cell_w
+        self.cells = bytearray([DIGIT_BLANK] * width)
+        self._color = EntityColor()
+
+    def set_cell(self, index, tile):
+        if self.cells[index] != tile:
+            self.cells[index] = tile
+            self[index] = tile
+
+    def set_pair(self, index, value):
+        self.set_cell(index, value // 10)
+        self.set_cell(index + 1, value % 10)
+
+    def apply_entity(self, entity, frame_rate):
+        color = self._color
+        if color.update(entity, frame_rate):
+            self.hidden = not color.on
+            self.pixel_shader[1] = color.color
+
+
+class DigitClock(DigitGrid):
+    # HH:MM:SS, or HH:MM shifted right by three cells like ClockLabel
+    def __init__(self, x, y, font, color=0x111111):
+        super().__init__(x, y, font, 8, color)
+        self.x_orig = x
+        self._show_seconds = None
+        frame_clock.subscribe(EPOCH_SECOND, self._on_second)
+
+    def tick(self, store, epochs):
+        self.apply_entity(store["entities"]["time_rgb"], store["frame_rate"])
+
+    def _on_second(self, now):
+        show_seconds = store["entities"]["time_seconds"].on
+        if show_seconds != self._show_seconds:
+            self._show_seconds = show_seconds
+            self.x = self.x_orig if show_seconds else self.x_orig + 3 * self.cell_width
+            self.set_cell(2, DIGIT_COLON)
+            self.set_cell(5, DIGIT_COLON if show_seconds else DIGIT_BLANK)
+            if not show_seconds:
+                self.set_cell(6, DIGIT_BLANK)
+                self.set_cell(7, DIGIT_BLANK)
+        self.set_pair(0, now.tm_hour)
+        self.set_pair(3, now.tm_min)
+        if show_seconds:
+            self.set_pair(6, now.tm_sec)
+
+
+class DigitCalendar(DigitGrid):
+    # DD/MM
+    def __init__(self, x, y, font, color=0x111111):
+        super().__init__(x, y, font, 5, color)
+        self.set_cell(2, DIGIT_SLASH)
+        frame_clock.subscribe(EPOCH_DAY, self._on_day)
+
+    def tick(self, store, epochs):
+        self.apply_entity(store["entities"]["date_rgb"], store["frame_rate"])
+
+    def _on_day(self, now):
+        self.set_pair(0, now.tm_mday)
+        self.set_pair(3, now.tm_mon)
+
+
+if CLOCK_WIDGET == "atlas":
+    ClockWidget, CalendarWidget = DigitClock, DigitCalendar
+else:
+    ClockWidget, CalendarWidget = ClockLabel, CalendarLabel
+
+
+class SceneManager:
+    # Tracks the scene (theme / blank) and the status overlay (splash), the
+    # display is only touched on transitions and the label on text changes
+    def __init__(self, display, splash, scene=None):
+        self.display = display
+        self.splash = splash
+        self.scene = scene
+        self.status = None
+        self.group = None
+        self.transitions = 0
+
+    def set_scene(self, scene):
+        if scene is not self.scene:
+            self.scene = scene
+            self._show()
+
+    def set_status(self, text=None):
+        # None removes the overlay, the label keeps its last text
+        if text != self.status:
+            self.status = text
+            if text is not None and self.splash[0].text != text:
+                self.splash[0].text = text
+            self._show()
+
+    def _show(self):
+        group = self.splash if self.status is not None else self.scene
+        if group is not self.group and group is not None:
+            self.group = group
+            self.display.show(group)
+            self.transitions += 1
 
 
 def build_splash_group(font, text="loading..."):
@@ -178,17 +687,189 @@ def build_splash_group(font, text="loading..."):
     return group
 
 
+class PaletteBrightness:
+    # Global brightness for theme palettes: every palette gets a table of
+    # precomputed colours per brightness level (normalise/gamma like
+    # PaletteFader), a level change just copies one row of the table into
+    # the palette. Ramps set start + delta * k // frames once per frame.
+    def __init__(self, levels=BRIGHTNESS_LEVELS, brightness=BRIGHTNESS):
+        self.levels = levels
+        self.palettes = []
+        self.tables = []
+        self.pinned = []
+        self.level = round(brightness * (levels - 1))
+        self.target = self.level
+        self.start = self.level
+        self.frame = 0
+        self.frames = 0
+        self._entity_version = None
+
+    def add(self, source, gamma=PALETTE_GAMMA, normalize=PALETTE_NORMALIZE, visible=False):
+        count = len(source)
+        factor = 1.0
+        if normalize:
+            max_component = 0
+            for i in range(count):
+                color = source[i]
+                max_component = max(max_component, color >> 16, (color >> 8) & 0xFF, color & 0xFF)
+            if max_component:
+                factor = 0xFF / max_component
+        palette = Palette(count)
+        table = array("L", [0] * (count * self.levels))
+        for i in range(count):
+            color = source[i]
+            channels = [
+                (((color >> shift) & 0xFF) * factor / 0xFF) ** gamma for shift in (16, 8, 0)
+            ]
+            for level in range(self.levels):
+                brightness = level / (self.levels - 1)
+                value = 0
+                for channel in channels:
+                    component = min(0xFF, round(channel * brightness * 0xFF))
+                    if visible and level and channel and component < MATRIX_MIN_CHANNEL:
+                        # clamp to the lowest colour the matrix shows, off stays off
+                        component = MATRIX_MIN_CHANNEL
+                    value = (value << 8) | component
+                table[level * count + i] = value
+            if source.is_transparent(i):
+                palette.make_transparent(i)
+        self.palettes.append(palette)
+        self.tables.append(table)
+        self.pinned.append(bytearray(count))
+        self._write(len(self.palettes) - 1, self.level)
+        return palette
+
+    def pin(self, palette, index):
+        # entry written by the theme itself (e.g. from a light entity)
+        self.pinned[self.palettes.index(palette)][index] = 1
+
+    def checkpoint(self):
+        return len(self.palettes)
+
+    def rollback(self, checkpoint):
+        # forget palettes added since the checkpoint (e.g. a theme)
+        del self.palettes[checkpoint:]
+        del self.tables[checkpoint:]
+        del self.pinned[checkpoint:]
+
+    def tick(self, entity, frame_rate):
+        if entity.version != self._entity_version:
+            frames = entity.transition_frames(self._entity_version, frame_rate)
+            self._entity_version = entity.version
+            target = (entity.brightness * (self.levels - 1) + 127) // 255 if entity.on else 0
+            self.target = target
+            self.start = self.level
+            self.frame = 0
+            if frames > 1 and target != self.level:
+                self.frames = frames
+            else:
+                self.frames = 0
+                self.set_level(target)
+        if self.frames:
+            self.frame += 1
+            if self.frame >= self.frames:
+                self.frames = 0
+                level = self.target
+            else:
+                level = self.start + (self.target - self.start) * self.frame // self.frames
+            if level != self.level:
+                self.set_level(level)
+
+    def set_level(self, level):
+        if level == self.level:
+            return
+        self.level = level
+        for n in range(len(self.palettes)):
+            self._write(n, level)
+
+    def _write(self, n, level):
+        palette = self.palettes[n]
+        table = self.tables[n]
+        pinned = self.pinned[n]
+        count = len(palette)
+        offset = level * count
+        for i in range(count):
+            if not pinned[i]:
+                palette[i] = table[offset + i]
+
+
+palette_brightness = PaletteBrightness()
+
+
 def load_bitmap(
     filename,
-    brightness=BRIGHTNESS,
     gamma=PALETTE_GAMMA,
     normalize=PALETTE_NORMALIZE,
     transparent_index=None,
+    in_ram=BITMAP_IN_RAM,
+    tiles=None,
+    tile_width=None,
+    tile_height=None,
 ):
+    # in_ram decodes the sheet into a Bitmap sized for the palette instead of
+    # reading flash on every blit, tiles (with tile_width/height) keeps only
+    # those tiles: tile n of the returned bitmap is tiles[n]. The sheet on
+    # flash can only serve a leading run of tiles, any other subset is
+    # decoded into RAM.
     bitmap = OnDiskBitmap(filename)
     palette = bitmap.pixel_shader
     if transparent_index is not None:
         palette.make_transparent(transparent_index)
-    palette_adj = PaletteFader(palette, brightness, gamma, normalize)
+    palette = palette_brightness.add(palette, gamma, normalize)
+    if not in_ram and tiles is not None and any(tile != n for n, tile in enumerate(tiles)):
+        logger(f"load bitmap: filename={filename} tile subset needs in_ram")
+        in_ram = True
+    if in_ram:
+        bitmap = _decode_bitmap(
+            filename, len(palette), transparent_index, tiles, tile_width, tile_height
+        )
     gc.collect()
-    return bitmap, palette_adj.palette
+    return bitmap, palette
+
+
+def bitmap_bytes(width, height, value_count):
+    # displayio.Bitmap storage: 1/2/4/8/16/32 bits per pixel, 32 bit aligned rows
+    bits = 1
+    while (1 << bits) < value_count:
+        bits *= 2
+    return (width * bits + 31) // 32 * 4 * height
+
+
+def _decode_bitmap(filename, value_count, fallback_index, tiles, tile_width, tile_height):
+    with open(filename, "rb") as f:
+        header = bytearray(54)
+        f.readinto(header)
+        offset, _, width, height, _, bits = struct.unpack_from("<IIiiHH", header, 10)
+        stride = (width * bits + 31) // 32 * 4
+        bottom_up = height > 0
+        height = abs(height)
+        if tiles is None:
+            # the whole sheet as a single "tile"
+            tiles = (0,)
+            tile_width = width
+            tile_height = height
+        columns = width // tile_width
+        target = Bitmap(tile_width * len(tiles), tile_height, value_count)
+        row = bytearray(stride)
+        pixels_per_byte = 8 // bits
+        mask = (1 << bits) - 1
+        fallback = fallback_index or 0
+        for n, tile in enumerate(tiles):
+            src_x = (tile % columns) * tile_width
+            src_y = (tile // columns) * tile_height
+            dst_x = n * tile_width
+            for y in range(tile_height):
+                file_row = height - 1 - (src_y + y) if bottom_up else src_y + y
+                f.seek(offset + file_row * stride)
+                f.readinto(row)
+                for x in range(tile_width):
+                    sx = src_x + x
+                    shift = (pixels_per_byte - 1 - sx % pixels_per_byte) * bits
+                    value = (row[sx // pixels_per_byte] >> shift) & mask
+                    target[dst_x + x, y] = value if value < value_count else fallback
+    full = bitmap_bytes(width, height, value_count)
+    used = bitmap_bytes(target.width, target.height, value_count)
+    logger(
+        f"bitmap: file={filename} ram_bytes={used} full_sheet_bytes={full} tiles={len(tiles)} value_count={value_count}"
+    )
+    return target
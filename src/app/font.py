@@ -0,0 +1,84 @@
+import os
+import struct
+from displayio import Bitmap
+from fontio import Glyph
+from adafruit_bitmap_font import bitmap_font
+
+from app.constants import FONT_GLYPHS
+from app.utils import logger
+
+ATLAS_MAGIC = b"GLA1"
+ATLAS_HEADER = "<4sBBbbBBH"
+ATLAS_HEADER_SIZE = 12
+ATLAS_INDEX = "<HB"
+ATLAS_INDEX_SIZE = 3
+
+
+class GlyphAtlasFont:
+    # Glyph atlas built by scripts/build_font_atlas.py: read in one go and
+    # kept as cell sized tiles of a single bitmap, optionally only a subset
+    def __init__(self, path, glyphs=None):
+        data = bytearray(os.stat(path)[6])
+        with open(path, "rb") as f:
+            f.readinto(data)
+        magic, cell_w, cell_h, dx, dy, ascent, descent, count = struct.unpack_from(
+            ATLAS_HEADER, data, 0
+        )
+        if magic != ATLAS_MAGIC:
+            raise ValueError(f"not a glyph atlas: {path}")
+        self.ascent = ascent
+        self.descent = descent
+        self._bounding_box = (cell_w, cell_h, dx, dy)
+        wanted = None if glyphs is None else set(ord(c) for c in glyphs)
+        selected = []
+        for i in range(count):
+            code_point, shift_x = struct.unpack_from(
+                ATLAS_INDEX, data, ATLAS_HEADER_SIZE + i * ATLAS_INDEX_SIZE
+            )
+            if wanted is None or code_point in wanted:
+                selected.append((i, code_point, shift_x))
+        row_bytes = (cell_w + 7) // 8
+        pixels = ATLAS_HEADER_SIZE + count * ATLAS_INDEX_SIZE
+        self.bitmap = Bitmap(cell_w * max(len(selected), 1), cell_h, 2)
+        self._glyphs = dict()
+        for tile, (i, code_point, shift_x) in enumerate(selected):
+            offset = pixels + i * cell_h * row_bytes
+            x0 = tile * cell_w
+            for y in range(cell_h):
+                for b in range(row_bytes):
+                    value = data[offset + y * row_bytes + b]
+                    if not value:
+                        continue
+                    for x in range(min(8, cell_w - b * 8)):
+                        if value & (0x80 >> x):
+                            self.bitmap[x0 + b * 8 + x, y] = 1
+            self._glyphs[code_point] = Glyph(
+                self.bitmap, tile, cell_w, cell_h, dx, dy, shift_x, 0
+            )
+        del data, selected
+
+    def get_bounding_box(self):
+        return self._bounding_box
+
+    def get_glyph(self, code_point):
+        return self._glyphs.get(code_point)
+
+    def load_glyphs(self, code_points):
+        pass
+
+
+def load_font(path, glyphs=FONT_GLYPHS):
+    # prefer the precompiled atlas next to the BDF, otherwise preload the
+    # declared glyphs from the BDF so labels never parse it on first use
+    atlas = path.rsplit(".", 1)[0] + ".gla"
+    try:
+        font = GlyphAtlasFont(atlas, glyphs)
+        logger(f"font: atlas={atlas} glyphs={len(font._glyphs)}")
+        return font
+    except OSError:
+        pass
+    font = bitmap_font.load_font(path)
+    if glyphs:
+        font.load_glyphs(glyphs)
+    logger(f"font: bdf={path} preloaded={glyphs}")
+    return font
@@ -1,54 +1,82 @@
 import asyncio
 import board
-import gc
 import json
 import microcontroller
 from keypad import Keys
-from rtc import RTC
 import adafruit_minimqtt.adafruit_minimqtt as MQTT
+from adafruit_ticks import ticks_ms, ticks_add, ticks_less
 
 from app.constants import (
-    NTP_INTERVAL,
     ASYNCIO_MQTT_PING_INTERVAL,
     ASYNCIO_MQTT_POLL_DELAY,
     ASYNCIO_GPIO_POLL_DELAY,
+    MQTT_QUEUE_SIZE,
+    MQTT_DRAIN_BUDGET_MS,
     MQTT_PREFIX,
-    NTP_TIMEZONE,
+    BRIGHTNESS,
+    LOG_MQTT,
+    LOG_DRAIN_INTERVAL,
+    LOG_DRAIN_BATCH,
     BUTTON_UP,
     BUTTON_DOWN
 )
 from app.storage import store
-from app.utils import logger, fetch_json, parse_timestamp
+from app.memory import memory
+from app.profiler import profiler
+from app.utils import logger, debug, warning, log_buffer, rgb_dict_to_hex
 
 from secrets import secrets
 
-mqtt_messages = []
 
-# NETWORK
-
-DATETIME_API = f"http://worldtimeapi.org/api/timezone/{NTP_TIMEZONE}"
-
-
-def network_time_update(network):
-    logger("network time: setting")
+class MessageQueue:
+    # Fixed capacity ring buffer of topics, a command arriving for a topic
+    # that is still queued is coalesced with the pending message: JSON
+    # objects (partial light commands) are merged with later keys winning,
+    # plain payloads (switch, select) are replaced
+    def __init__(self, capacity=MQTT_QUEUE_SIZE):
+        self.capacity = capacity
+        self.topics = [None] * capacity
+        self.messages = dict()
+        self.head = 0
+        self.count = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.count
+
+    def put(self, topic, message):
+        if topic in self.messages:
+            self.messages[topic] = _merge_messages(self.messages[topic], message)
+            self.coalesced += 1
+            return
+        if self.count == self.capacity:
+            self.get()
+            self.dropped += 1
+        self.topics[(self.head + self.count) % self.capacity] = topic
+        self.messages[topic] = message
+        self.count += 1
+
+    def get(self):
+        topic = self.topics[self.head]
+        self.topics[self.head] = None
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        return topic, self.messages.pop(topic)
+
+
+def _merge_messages(pending, message):
+    if not (pending.startswith("{") and message.startswith("{")):
+        return message
     try:
-        resp = fetch_json(DATETIME_API)
-        timestamp = resp["datetime"]
-        logger(f"network time: fetched timestamp={timestamp}")
-        timetuple = parse_timestamp(resp["datetime"])
-        RTC().datetime = timetuple
-        del resp, timestamp, timetuple
-        gc.collect()
-    except Exception as error:
-        logger(f"network time fetch failed: error={error}")
+        merged = json.loads(pending)
+        merged.update(json.loads(message))
+    except ValueError:
+        return message
+    return json.dumps(merged)
 
 
-async def network_time_poll(network):
-    while True:
-        network_time_update(network)
-        gc.collect()
-        await asyncio.sleep(NTP_INTERVAL)
-
+mqtt_messages = MessageQueue()
 
 # MQTT
 
@@ -71,8 +99,8 @@ def mqtt_connect(socket, network, store):
         store["online_mqtt"] = False
 
 def on_mqtt_message(client, topic, message):
-    logger(f"mqtt received: topic={topic} message={message}")
-    mqtt_messages.append((topic, message))
+    debug("mqtt received: topic=%s message=%s", topic, message)
+    mqtt_messages.put(topic, message)
     # process_message(client, topic, message)
 
 
@@ -88,41 +116,75 @@ async def mqtt_ping(client, hass, store, timeout=ASYNCIO_MQTT_PING_INTERVAL):
     while True:
         if store["online_mqtt"] == None or store["online_mqtt"] == True:
             try:
-                logger("mqtt ping")
+                debug("mqtt ping")
                 client.ping()
-                gc.collect()
+                memory.poll()
             except Exception as error:
-                logger(f"mqtt ping failed, setting mqtt offline")
+                warning("mqtt ping failed, setting mqtt offline")
                 store["online_mqtt"] = False
         else:
             try:
                 client.connect()
-                gc.collect()
                 hass.advertise_entities()
-                gc.collect()
+                memory.poll()
                 store["online_mqtt"] = True
                 retry_count = 0
             except Exception as error:
-                logger(f"mqtt offline, cannot reconnect: error={error} retry_count={retry_count}")
+                warning("mqtt offline, cannot reconnect: error=%s retry_count=%d", error, retry_count)
                 retry_count += 1
         if retry_count > 3:
             microcontroller.reset()
         await asyncio.sleep(timeout)
 
 
+async def log_drain(client, store, topic, interval=LOG_DRAIN_INTERVAL, batch=LOG_DRAIN_BATCH):
+    # low priority: from here on log records are buffered and written out in
+    # batches to serial and (log_mqtt) the MQTT log topic, the ring is
+    # emptied every pass, records it had to overwrite are reported
+    log_buffer.deferred = True
+    dropped = 0
+    while True:
+        await asyncio.sleep(interval)
+        if log_buffer.dropped != dropped:
+            warning("log buffer: dropped=%d size=%d", log_buffer.dropped - dropped, log_buffer.size)
+            dropped = log_buffer.dropped
+        while len(log_buffer):
+            lines = []
+            while len(log_buffer) and len(lines) < batch:
+                line = log_buffer.get()
+                if log_buffer.serial:
+                    print(line)
+                lines.append(line)
+            if LOG_MQTT and store["online_mqtt"]:
+                try:
+                    client.publish(topic, "\n".join(lines), retain=False, qos=0)
+                except Exception as error:
+                    pass
+            del lines
+            await asyncio.sleep(0)
+
+
 async def mqtt_poll(client, hass, timeout=ASYNCIO_MQTT_POLL_DELAY):
     while True:
+        start = profiler.start()
+        processed = 0
         try:    
             client.loop(timeout=timeout)
-            if len(mqtt_messages):
-                topic, message = mqtt_messages.pop(0)
-                logger(f"mqtt queue: enqueued={len(mqtt_messages)} processing={topic}")
+            drain_deadline = ticks_add(ticks_ms(), MQTT_DRAIN_BUDGET_MS)
+            processed = len(mqtt_messages)
+            while len(mqtt_messages):
+                topic, message = mqtt_messages.get()
+                debug("mqtt queue: enqueued=%d coalesced=%d dropped=%d processing=%s", len(mqtt_messages), mqtt_messages.coalesced, mqtt_messages.dropped, topic)
                 hass.process_message(topic, message)
                 del topic, message
+                if not ticks_less(ticks_ms(), drain_deadline):
+                    break
         except Exception as error:
             # logger(f"mqtt poll error: error={error}")
             pass
-        gc.collect()
+        if processed:
+            memory.poll()
+        profiler.stop("mqtt_poll", start)
         await asyncio.sleep(timeout)
 
 
@@ -130,6 +192,20 @@ async def mqtt_poll(client, hass, timeout=ASYNCIO_MQTT_POLL_DELAY):
 
 HASS_DISCOVERY_TOPIC_PREFIX = "homeassistant"
 HASS_DISCOVERY_MANUFACTURER = "jinglemansweep"
+HASS_ABBREVIATIONS = dict(
+    color_mode="clrm",
+    command_topic="cmd_t",
+    device_class="dev_cla",
+    json_attributes_topic="json_attr_t",
+    object_id="obj_id",
+    options="ops",
+    state_class="stat_cla",
+    state_topic="stat_t",
+    supported_color_modes="sup_clrm",
+    unique_id="uniq_id",
+    unit_of_measurement="unit_of_meas",
+    value_template="val_tpl",
+)
 OPTS_LIGHT_RGB = dict(color_mode=True, supported_color_modes=["rgb"], brightness=False)
 
 
@@ -157,45 +233,89 @@ class HASSEntity:
         self.device_class = device_class
         self.options = options
         self.discovery_topic_prefix = discovery_topic_prefix
-        topic_prefix = self._build_entity_topic_prefix()
+        self.topic_prefix = topic_prefix = self._build_entity_topic_prefix()
         self.topic_config = f"{topic_prefix}/config"
         self.topic_command = f"{topic_prefix}/set"
         self.topic_state = f"{topic_prefix}/state"
+        self.config_payload = None
         self.state = dict()
+        # derived values, recomputed only when the state changes
+        self.version = 0
+        self.on = False
+        self.brightness = 255
+        self.rgb = None
+        self.rgb_dim = None
+        self.transition = 0
+        self.transition_version = None
 
     def configure(self):
-        auto_config = dict(
-            name=self.description,
-            object_id=self._build_full_name(),
-            unique_id=self._build_full_name(),
-            device_class=self.device_class,
-            device=dict(
-                identifiers=[self.host_id],
-                name=self.host_id,
-                model=self.entity_prefix,
-                manufacturer=HASS_DISCOVERY_MANUFACTURER,
-                sw_version="1.X"
-            ),
-            schema="json",
-            command_topic=self.topic_command,
-            state_topic=self.topic_state,
-        )
-        config = auto_config.copy()
-        config.update(self.options)
-        logger(f"hass entity configure: name={self.name} config={config}")
-        self.client.publish(self.topic_config, json.dumps(config), retain=True, qos=1)
-        self.client.subscribe(self.topic_command, 1)
-        del auto_config, config
+        # discovery payload is built and encoded once, re-advertising after a
+        # reconnect only publishes the cached bytes
+        if self.config_payload is None:
+            self.config_payload = self._build_config_payload()
+        self.client.publish(self.topic_config, self.config_payload, retain=True, qos=1)
+        if self.device_class != "sensor":
+            self.client.subscribe(self.topic_command, 1)
+
+    def _build_config_payload(self):
+        full_name = self._build_full_name()
+        config = {
+            "~": self.topic_prefix,
+            "name": self.description,
+            "obj_id": full_name,
+            "uniq_id": full_name,
+            "dev_cla": self.device_class,
+            "dev": {
+                "ids": [self.host_id],
+                "name": self.host_id,
+                "mdl": self.entity_prefix,
+                "mf": HASS_DISCOVERY_MANUFACTURER,
+                "sw": "1.X",
+            },
+            "schema": "json",
+            "cmd_t": "~/set",
+            "stat_t": "~/state",
+        }
+        for key, value in self.options.items():
+            if key == "json_attributes":
+                if value:
+                    config["json_attr_t"] = "~/state"
+            else:
+                config[HASS_ABBREVIATIONS.get(key, key)] = value
+        debug("hass entity configure: name=%s config=%s", self.name, config)
+        payload = json.dumps(config).encode()
+        del config
+        return payload
 
     def update(self, new_state=None):
         if new_state is None:
             new_state = dict()
+        # seconds, only applies to this command and is not part of the state
+        self.transition = new_state.pop("transition", 0)
         self.state.update(new_state)
-        logger(f"hass entity update: name={self.name} state={self.state}")
+        self.derive()
+        self.transition_version = self.version
+        debug("hass entity update: name=%s state=%s", self.name, self.state)
         self.client.publish(
             self.topic_state, self._get_hass_state(), retain=True, qos=1
         )
-        gc.collect()
+
+    def derive(self):
+        state = self.state
+        self.on = state.get("state") == "ON"
+        self.brightness = brightness = state.get("brightness", 255)
+        color = state.get("color")
+        if color is not None:
+            self.rgb = rgb_dict_to_hex(color, brightness)
+            self.rgb_dim = rgb_dict_to_hex(color, brightness // 2)
+        self.version += 1
+
+    def transition_frames(self, seen_version, frame_rate):
+        # frames to fade over: only for the version the transition came with
+        # and only for consumers that already showed an earlier state
+        if seen_version is None or self.transition_version != self.version:
+            return 0
+        return int(self.transition * frame_rate)
 
     def _build_full_name(self):
         return f"{self.entity_prefix}_{self.host_id}_{self.name}"
@@ -206,7 +326,7 @@ class HASSEntity:
     def _get_hass_state(self):
         return (
             self.state["state"]
-            if self.device_class == "switch"
+            if self.device_class in ("switch", "select")
             else json.dumps(self.state)
         )
 
@@ -226,6 +346,8 @@ class HASSManager:
         self.entity_prefix = entity_prefix
         self.discovery_topic_prefix = discovery_topic_prefix
         self.store["entities"] = dict()
+        self.topics = dict()
+        self.handlers = dict()
         logger(
             f"hass manager: host_id={host_id} discovery_topic_prefix={discovery_topic_prefix}"
         )
@@ -246,31 +368,64 @@ class HASSManager:
         entity.configure()
         entity.update(initial_state)
         self.store["entities"][name] = entity
+        self.topics[entity.topic_command] = entity
         logger(
             f"hass entity created: name={name} device_class={device_class} options={options} initial_state={initial_state}"
         )
         return entity
 
+    def add_handler(self, topic, callback):
+        # raw (non entity) topics, e.g. the fleet time beacon
+        self.handlers[topic] = callback
+        self.client.subscribe(topic, 0)
+        logger(f"hass handler added: topic={topic}")
+
     def process_message(self, topic, message):
-        logger(f"hass process message: topic={topic} message={message}")
-        for name, entity in self.store["entities"].items():
-            if topic == entity.topic_command:
-                logger(f"hass topic match entity={entity.name}")
-                entity.update(_message_to_hass(message, entity))
-                break
+        debug("hass process message: topic=%s message=%s", topic, message)
+        handler = self.handlers.get(topic)
+        if handler is not None:
+            handler(message)
+            return
+        entity = self.topics.get(topic)
+        if entity is not None:
+            debug("hass topic match entity=%s", entity.name)
+            new_state = _message_to_hass(message, entity)
+            if new_state is None:
+                warning("hass message rejected: entity=%s message=%s", entity.name, message)
+                return
+            entity.update(new_state)
 
     def advertise_entities(self):
         logger("advertising entities")
         for name, entity in self.store["entities"].items():
             entity.configure()
+        for topic in self.handlers:
+            self.client.subscribe(topic, 0)
 
 
-def _message_to_hass(message, entity):
-    return (
-        dict(state="ON" if message == "ON" else "OFF")
-        if entity.device_class == "switch"
-        else json.loads(message)
+def setup_entities(hass, themes=None, theme=None):
+    light_rgb_options = dict(
+        color_mode=True, supported_color_modes=["rgb"], brightness=True
     )
+    hass.add_entity("power", "Power", "switch", {}, dict(state="ON"))
+    hass.add_entity("brightness", "Brightness", "light", dict(color_mode=True, supported_color_modes=["brightness"], brightness=True), dict(state="ON", color_mode="brightness", brightness=round(BRIGHTNESS * 255)))
+    hass.add_entity("date_rgb", "Date", "light", light_rgb_options, dict(state="ON", color_mode="RGB", color=dict(r=0xff,g=0x00, b=0xff), brightness=63))
+    hass.add_entity("time_rgb", "Time", "light", light_rgb_options, dict(state="ON", color_mode="RGB", color=dict(r=0xff,g=0xff, b=0xff), brightness=63))
+    hass.add_entity("time_seconds", "Show Seconds", "switch", {}, dict(state="OFF"))
+    hass.add_entity("a_rgb", "Custom RGB A", "light", light_rgb_options, dict(state="ON", color_mode="RGB", color=dict(r=0x33,g=0xff, b=0x33), brightness=63))
+    if themes:
+        hass.add_entity("theme", "Theme", "select", dict(options=themes), dict(state=theme))
+
+
+def _message_to_hass(message, entity):
+    if entity.device_class == "switch":
+        return dict(state="ON" if message == "ON" else "OFF")
+    if entity.device_class == "select":
+        # unknown options are rejected before they become the entity state
+        if message not in entity.options["options"]:
+            return None
+        return dict(state=message)
+    return json.loads(message)
 
 
 # GPIO BUTTONS
@@ -281,11 +436,15 @@ async def gpio_poll(timeout=ASYNCIO_GPIO_POLL_DELAY):
         (board.BUTTON_UP, board.BUTTON_DOWN), value_when_pressed=False, pull=True
     ) as keys:
         while True:
+            start = profiler.start()
             key_event = keys.events.get()
             if key_event and key_event.pressed:
                 key_number = key_event.key_number
                 logger(f"button: key={key_number}")
                 store["button"] = key_number
                 if key_number == BUTTON_UP or key_number == BUTTON_DOWN:
-                    store["entities"]["power"].state["state"] = 'OFF' if store["entities"]["power"].state["state"] == 'ON' else 'ON'
+                    power = store["entities"]["power"]
+                    power.state["state"] = 'OFF' if power.on else 'ON'
+                    power.derive()
+            profiler.stop("gpio_poll", start)
             await asyncio.sleep(timeout)
@@ -0,0 +1,74 @@
+import gc
+import time
+
+from app.constants import GC_WATERMARK, GC_IDLE_WATERMARK, GC_IDLE_SLACK_MS, GC_THRESHOLD
+from app.profiler import profiler
+from app.utils import logger
+
+
+class MemoryManager:
+    # Collections happen when the heap is nearly full (watermark), during
+    # idle slack between frames, or via gc.threshold as a backstop, instead
+    # of a full collect in every async loop
+    def __init__(
+        self,
+        watermark=GC_WATERMARK,
+        idle_watermark=GC_IDLE_WATERMARK,
+        idle_slack_ms=GC_IDLE_SLACK_MS,
+        clock=time.monotonic_ns,
+    ):
+        self.watermark = watermark
+        self.idle_watermark = idle_watermark
+        self.idle_slack_ms = idle_slack_ms
+        self.clock = clock
+        self.threshold = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.collections = 0
+        self.idle_collections = 0
+        self.pause_us = 0
+        self.pause_us_max = 0
+        self.pause_us_total = 0
+        self.mem_free = None
+
+    def setup(self, threshold=GC_THRESHOLD):
+        # automatic collection after allocating roughly what is left above
+        # the watermark, so a busy loop without idle slack still collects
+        gc.collect()
+        if threshold is None:
+            threshold = max(gc.mem_free() - self.watermark, 4096)
+        if hasattr(gc, "threshold"):
+            gc.threshold(threshold)
+            self.threshold = threshold
+        self.mem_free = gc.mem_free()
+        logger(f"memory: threshold={self.threshold} watermark={self.watermark} idle_watermark={self.idle_watermark} mem_free={self.mem_free}")
+
+    def collect(self, idle=False):
+        start = self.clock()
+        gc.collect()
+        pause = (self.clock() - start) // 1000
+        self.collections += 1
+        if idle:
+            self.idle_collections += 1
+        self.pause_us = pause
+        self.pause_us_total += pause
+        if pause > self.pause_us_max:
+            self.pause_us_max = pause
+        self.mem_free = gc.mem_free()
+        if profiler.enabled:
+            profiler.record("gc", pause)
+
+    def poll(self):
+        if gc.mem_free() < self.watermark:
+            self.collect()
+
+    def idle(self, slack_ms):
+        if slack_ms >= self.idle_slack_ms and gc.mem_free() < self.idle_watermark:
+            self.collect(idle=True)
+
+    def __str__(self):
+        return f"gc={self.collections} gc_idle={self.idle_collections} pause_us={self.pause_us} pause_us_max={self.pause_us_max} pause_us_total={self.pause_us_total} mem_free={self.mem_free}"
+
+
+memory = MemoryManager()
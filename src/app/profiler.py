@@ -0,0 +1,157 @@
+import asyncio
+import time
+from array import array
+from displayio import Group
+
+from app.constants import PROFILER_ENABLE, PROFILER_INTERVAL
+from app.utils import logger, warning
+
+# Log-linear buckets in microseconds: 0-7us exact, then 4 buckets per power of
+# two, the last bucket also holds everything above ~130ms
+HISTOGRAM_BUCKETS = 64
+PROFILER_ENTITY_PREFIX = "prof_"
+PROFILER_SENSOR_OPTIONS = dict(
+    device_class="duration",
+    unit_of_measurement="ms",
+    state_class="measurement",
+    value_template="{{ value_json.p99 }}",
+    json_attributes=True,
+)
+
+
+def _bucket(us):
+    if us < 8:
+        return us
+    e = us.bit_length()
+    index = 4 * e + (us >> (e - 3)) - 12
+    return index if index < HISTOGRAM_BUCKETS else HISTOGRAM_BUCKETS - 1
+
+
+def _bucket_floor(index):
+    if index < 8:
+        return index
+    e = index // 4 + 2
+    return (index % 4 + 4) << (e - 3)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = array("L", [0] * HISTOGRAM_BUCKETS)
+        self.count = 0
+        self.max = 0
+
+    def record(self, us):
+        self.buckets[_bucket(us)] += 1
+        self.count += 1
+        if us > self.max:
+            self.max = us
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        target = self.count * q
+        seen = 0
+        for index in range(HISTOGRAM_BUCKETS):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(_bucket_floor(index + 1), self.max)
+        return self.max
+
+    def reset(self):
+        for index in range(HISTOGRAM_BUCKETS):
+            self.buckets[index] = 0
+        self.count = 0
+        self.max = 0
+
+    def stats(self):
+        return dict(
+            p50=self.percentile(0.5) / 1000,
+            p99=self.percentile(0.99) / 1000,
+            max=self.max / 1000,
+            count=self.count,
+        )
+
+
+class Profiler:
+    def __init__(self, enabled=PROFILER_ENABLE, clock=time.monotonic_ns):
+        self.enabled = enabled
+        self.clock = clock
+        self.histograms = dict()
+
+    def start(self):
+        return self.clock() if self.enabled else 0
+
+    def stop(self, name, start):
+        if self.enabled:
+            self.record(name, (self.clock() - start) // 1000)
+
+    def record(self, name, us):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.record(us)
+
+    def instrument(self, theme, prefix="theme_"):
+        # wrap the tick of every theme component, members of groups (e.g.
+        # lemmings actors) share the histogram of the group attribute
+        if not self.enabled:
+            return
+        wrapped = []
+        for name, component in theme.__dict__.items():
+            if hasattr(component, "tick"):
+                self._wrap(component, prefix + name)
+                wrapped.append(component)
+        for name, component in theme.__dict__.items():
+            if isinstance(component, Group) and component not in wrapped:
+                for child in component:
+                    if hasattr(child, "tick") and child not in wrapped:
+                        self._wrap(child, prefix + name)
+                        wrapped.append(child)
+
+    def _wrap(self, component, name):
+        tick = component.tick
+        clock = self.clock
+        record = self.record
+
+        def timed_tick(*args):
+            start = clock()
+            tick(*args)
+            record(name, (clock() - start) // 1000)
+
+        component.tick = timed_tick
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def report(self):
+        return {name: histogram.stats() for name, histogram in self.histograms.items()}
+
+
+profiler = Profiler()
+
+
+async def profiler_poll(hass, interval=PROFILER_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        entities = hass.store["entities"]
+        for name, histogram in profiler.histograms.items():
+            if not histogram.count:
+                continue
+            entity_name = PROFILER_ENTITY_PREFIX + name
+            stats = histogram.stats()
+            logger(f"profiler: phase={name} stats={stats}")
+            try:
+                if entity_name not in entities:
+                    hass.add_entity(
+                        entity_name,
+                        f"Profiler {name}",
+                        "sensor",
+                        PROFILER_SENSOR_OPTIONS,
+                        stats,
+                    )
+                else:
+                    entities[entity_name].update(stats)
+            except Exception as error:
+                warning("profiler publish failed: error=%s", error)
+        profiler.reset()
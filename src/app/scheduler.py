@@ -0,0 +1,69 @@
+import asyncio
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+from app.constants import FRAME_RATE
+from app.profiler import profiler
+
+
+class FrameScheduler:
+    def __init__(self, frame_rate=FRAME_RATE):
+        self.set_frame_rate(frame_rate)
+        self.reset_stats()
+
+    def set_frame_rate(self, frame_rate):
+        self.frame_rate = frame_rate
+        self.frame_interval = 1000 // frame_rate
+
+    def reset_stats(self):
+        self.frames = 0
+        self.late_frames = 0
+        self.dropped_frames = 0
+        self.frame_time = 0
+        self.frame_time_max = 0
+        self.frame_time_total = 0
+
+    @property
+    def frame_time_avg(self):
+        return self.frame_time_total / self.frames if self.frames else 0
+
+    async def run(self, tick, idle=None, display=None):
+        # single frame in flight: the next tick only starts after this one
+        # returned, missed deadlines are dropped instead of queued. idle is
+        # called with the slack left before the next frame (e.g. gc). With a
+        # display (auto_refresh off) it is refreshed once after every tick,
+        # right away: the scheduler owns the pacing, not displayio.
+        deadline = ticks_ms()
+        while True:
+            start = ticks_ms()
+            await tick()
+            if display is not None:
+                self._refresh(display)
+            now = ticks_ms()
+            self._record(ticks_diff(now, start))
+            deadline = ticks_add(deadline, self.frame_interval)
+            behind = ticks_diff(now, deadline)
+            if behind > 0:
+                missed = behind // self.frame_interval + 1
+                self.late_frames += 1
+                self.dropped_frames += missed
+                deadline = ticks_add(deadline, missed * self.frame_interval)
+            elif idle is not None:
+                idle(ticks_diff(deadline, now))
+            await asyncio.sleep(max(0, ticks_diff(deadline, ticks_ms())) / 1000)
+
+    def _refresh(self, display):
+        # without a target rate displayio neither skips, waits nor checks a
+        # minimum rate, the refresh always happens
+        start = profiler.start()
+        display.refresh(target_frames_per_second=None)
+        profiler.stop("refresh", start)
+
+    def _record(self, frame_time):
+        self.frames += 1
+        self.frame_time = frame_time
+        self.frame_time_total += frame_time
+        if frame_time > self.frame_time_max:
+            self.frame_time_max = frame_time
+
+    def __str__(self):
+        return f"fps={self.frame_rate} frames={self.frames} late={self.late_frames} dropped={self.dropped_frames} frame_ms={self.frame_time} avg_ms={self.frame_time_avg:.1f} max_ms={self.frame_time_max}"
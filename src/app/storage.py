@@ -1,6 +1,9 @@
+from app.constants import FRAME_RATE
+
 store = {
     "frame": 0,
-    "ts_last": None,
+    "frame_rate": FRAME_RATE,
+    "ticks": 0,
     "button": None,
     "entities": {},
     "online_mqtt": None
@@ -0,0 +1,92 @@
+import gc
+import os
+import sys
+from adafruit_ticks import ticks_ms, ticks_diff
+
+from app.clock import frame_clock
+from app.constants import THEMES_PATH
+from app.display import BlankGroup, palette_brightness
+from app.memory import memory
+from app.utils import logger, warning
+
+
+class BlankTheme:
+    # stands in when no theme loads at all, keeps the event loop ticking
+    def __init__(self):
+        self.group = BlankGroup()
+
+    def tick(self, store, epochs):
+        pass
+
+
+class ThemeManager:
+    # Themes are installed side by side as <path>/<name>.py + .bmp and only
+    # the active one is imported. Unloading drops the theme, its clock
+    # subscriptions, palettes and module, then collects, so the next theme
+    # is built in the freed heap rather than around the previous one.
+    def __init__(self, width, height, font, path=THEMES_PATH):
+        self.width = width
+        self.height = height
+        self.font = font
+        self.package = path.strip("/")
+        self.names = sorted(
+            name.rsplit(".", 1)[0]
+            for name in os.listdir(path)
+            if name.endswith(".py") or name.endswith(".mpy")
+        )
+        self.name = None
+        self.theme = None
+        self._checkpoint = None
+        logger(f"themes: available={self.names}")
+
+    def load(self, name):
+        # callers must drop their own references to the current theme first
+        if name not in self.names:
+            raise ValueError(f"unknown theme: {name}")
+        if self.theme is not None:
+            self.unload()
+        start = ticks_ms()
+        mem_free = gc.mem_free()
+        self._checkpoint = (frame_clock.checkpoint(), palette_brightness.checkpoint())
+        try:
+            module = __import__(f"{self.package}.{name}", None, None, ("Theme",))
+            self.theme = module.Theme(width=self.width, height=self.height, font=self.font)
+        except Exception:
+            self._release(name)
+            memory.collect()
+            raise
+        del module
+        self.name = name
+        memory.collect()
+        logger(f"theme: loaded name={name} load_ms={ticks_diff(ticks_ms(), start)} mem_free_before={mem_free} mem_free_after={memory.mem_free}")
+        return self.theme
+
+    def fallback(self, name, failed):
+        # after failed did not load: back to name, else any other theme, else blank
+        for candidate in [name] + [other for other in self.names if other not in (name, failed)]:
+            try:
+                return self.load(candidate)
+            except Exception as error:
+                warning("theme: fallback failed name=%s error=%s", candidate, error)
+        return BlankTheme()
+
+    def unload(self):
+        name = self.name
+        start = ticks_ms()
+        mem_free = gc.mem_free()
+        if hasattr(self.theme, "teardown"):
+            self.theme.teardown()
+        self.theme = None
+        self._release(name)
+        memory.collect()
+        logger(f"theme: unloaded name={name} unload_ms={ticks_diff(ticks_ms(), start)} mem_free_before={mem_free} mem_free_after={memory.mem_free}")
+
+    def _release(self, name):
+        clock_checkpoint, palette_checkpoint = self._checkpoint
+        frame_clock.rollback(clock_checkpoint)
+        palette_brightness.rollback(palette_checkpoint)
+        sys.modules.pop(f"{self.package}.{name}", None)
+        package = sys.modules.get(self.package)
+        if package is not None and hasattr(package, name):
+            delattr(package, name)
+        self.name = None
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import struct
+import time
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff, ticks_less
+
+from app.clock import frame_clock
+from app.memory import memory
+from app.constants import (
+    NTP_API,
+    NTP_SERVER,
+    NTP_UTC_OFFSET,
+    NTP_DST,
+    NTP_INTERVAL,
+    NTP_TIMEOUT,
+    NTP_RETRY_DELAY,
+    NTP_SLEW_LIMIT_MS,
+    NTP_BEACON_TOPIC,
+    NTP_BEACON_INTERVAL,
+)
+from app.utils import logger, warning, parse_timestamp
+
+HTTP_CHUNK_SIZE = 256
+HTTP_POLL_DELAY = 0.01
+SNTP_PORT = 123
+SNTP_PACKET_SIZE = 48
+SNTP_EPOCH_OFFSET = 2208988800  # 1900-01-01 to 1970-01-01
+ESP32SPI_UDP_MODE = 1
+
+
+class SNTPTimeSource:
+    # single 48 byte UDP request/response, the timezone offset is applied
+    # locally so only the transmit timestamp is needed from the server
+    name = "sntp"
+
+    def __init__(self, socket, server=NTP_SERVER, port=SNTP_PORT):
+        self.socket = socket
+        self.server = server
+        self.port = port
+        self.bytes = 0
+        self.packet = bytearray(SNTP_PACKET_SIZE)
+
+    async def fetch(self, timeout=NTP_TIMEOUT):
+        deadline = ticks_add(ticks_ms(), int(timeout * 1000))
+        packet = self.packet
+        for i in range(SNTP_PACKET_SIZE):
+            packet[i] = 0
+        packet[0] = 0x1B  # LI=0, VN=3, Mode=3 (client)
+        self.bytes = 0
+        address = self.socket.getaddrinfo(self.server, self.port)[0][-1]
+        sock = self.socket.socket(self.socket.AF_INET, self.socket.SOCK_DGRAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(address, ESP32SPI_UDP_MODE)
+            sock.send(packet)
+            self.bytes += SNTP_PACKET_SIZE
+            while not sock.available():
+                if not ticks_less(ticks_ms(), deadline):
+                    raise OSError("time source timeout")
+                await asyncio.sleep(HTTP_POLL_DELAY)
+            count = sock.recv_into(packet, SNTP_PACKET_SIZE)
+            self.bytes += count
+        finally:
+            sock.close()
+        if count < SNTP_PACKET_SIZE or packet[1] == 0:
+            raise OSError("time source sntp error: invalid response")
+        seconds, fraction = struct.unpack_from("!II", packet, 40)
+        ts = seconds - SNTP_EPOCH_OFFSET
+        return ts + utc_offset(ts), (fraction * 1000) >> 32
+
+
+def utc_offset(ts, offset=NTP_UTC_OFFSET, dst=NTP_DST):
+    # seconds to add to a UTC timestamp for local time, offset is in minutes
+    offset = offset * 60
+    if dst == "eu":
+        # last Sunday of March to last Sunday of October, 01:00 UTC
+        year = time.localtime(ts)[0]
+        if _sunday(year, 3, -1) + 3600 <= ts < _sunday(year, 10, -1) + 3600:
+            return offset + 3600
+    elif dst == "us":
+        # second Sunday of March to first Sunday of November, 02:00 local
+        local = ts + offset
+        year = time.localtime(local)[0]
+        if _sunday(year, 3, 2) + 7200 <= local < _sunday(year, 11, 1) + 3600:
+            return offset + 3600
+    return offset
+
+
+def _sunday(year, month, n):
+    # nth Sunday of the month (-1 for the last one) as a timestamp at 00:00
+    if n > 0:
+        first = int(time.mktime((year, month, 1, 0, 0, 0, 0, 0, -1)))
+        return first + ((6 - time.localtime(first)[6]) % 7 + (n - 1) * 7) * 86400
+    next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    last = int(time.mktime(next_month + (1, 0, 0, 0, 0, 0, -1))) - 86400
+    return last - ((time.localtime(last)[6] + 1) % 7) * 86400
+
+
+class HTTPTimeSource:
+    # worldtimeapi style JSON over plain HTTP, read cooperatively from the
+    # socket so the event loop keeps rendering while the response trickles in
+    name = "http"
+
+    def __init__(self, socket, url=NTP_API):
+        self.socket = socket
+        self.url = url
+        self.bytes = 0
+
+    async def fetch(self, timeout=NTP_TIMEOUT):
+        deadline = ticks_add(ticks_ms(), int(timeout * 1000))
+        _, _, host, path = self.url.split("/", 3)
+        port = 80
+        if ":" in host:
+            host, port = host.split(":")
+            port = int(port)
+        self.bytes = 0
+        address = self.socket.getaddrinfo(host, port)[0][-1]
+        sock = self.socket.socket(self.socket.AF_INET, self.socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(address)
+            request = f"GET /{path} HTTP/1.0\r\nHost: {host}\r\nConnection: close\r\n\r\n"
+            sock.send(request.encode())
+            self.bytes += len(request)
+            response = bytearray()
+            buffer = bytearray(HTTP_CHUNK_SIZE)
+            body_start = content_length = None
+            while body_start is None or len(response) - body_start < content_length:
+                if not ticks_less(ticks_ms(), deadline):
+                    raise OSError("time source timeout")
+                available = sock.available()
+                if not available:
+                    await asyncio.sleep(HTTP_POLL_DELAY)
+                    continue
+                count = sock.recv_into(buffer, min(available, HTTP_CHUNK_SIZE))
+                response.extend(buffer[:count])
+                if body_start is None:
+                    body_start, content_length = _parse_http_headers(response)
+            self.bytes += len(response)
+        finally:
+            sock.close()
+        timestamp = json.loads(str(response[body_start : body_start + content_length], "utf-8"))["datetime"]
+        del response, buffer
+        # 2022-11-04T21:46:57.174308+00:00
+        ts = int(time.mktime(parse_timestamp(timestamp)))
+        fraction = timestamp.split(".", 1)[1] if "." in timestamp else "0"
+        ms = int((fraction[:3] + "00")[:3])
+        return ts, ms
+
+
+def _parse_http_headers(response):
+    end = response.find(b"\r\n\r\n")
+    if end < 0:
+        return None, None
+    headers = str(response[:end], "utf-8").lower()
+    if " 200 " not in headers.split("\r\n", 1)[0]:
+        raise OSError("time source http error: " + headers.split("\r\n", 1)[0])
+    start = headers.find("content-length:")
+    if start < 0:
+        raise OSError("time source http error: no content-length")
+    length = int(headers[start + 15 :].split("\r\n", 1)[0])
+    return end + 4, length
+
+
+class TimeSync:
+    def __init__(self, sources, interval=NTP_INTERVAL, timeout=NTP_TIMEOUT):
+        self.sources = sources
+        self.interval = interval
+        self.timeout = timeout
+        self.syncs = 0
+        self.failures = 0
+        self.retries = 0
+        self.source = None
+        self.latency_ms = None
+        self.offset_ms = None
+        self.bytes = None
+
+    async def sync(self):
+        for source in self.sources:
+            try:
+                start = ticks_ms()
+                ts, ms = await source.fetch(self.timeout)
+                latency = ticks_diff(ticks_ms(), start)
+            except Exception as error:
+                warning("time sync: source=%s failed error=%s", source.name, error)
+                continue
+            # the remote time was sampled roughly half way through the request
+            self.apply(source, ts * 1000 + ms + latency // 2, latency)
+            return True
+        self.failures += 1
+        return False
+
+    def apply(self, source, remote_ms, latency=0):
+        offset = remote_ms - frame_clock.time_ms()
+        if abs(offset) > NTP_SLEW_LIMIT_MS:
+            frame_clock.set_time(remote_ms // 1000, remote_ms % 1000)
+        else:
+            frame_clock.slew(offset)
+        self.syncs += 1
+        self.source = source.name
+        self.latency_ms = latency
+        self.offset_ms = offset
+        self.bytes = source.bytes
+        logger(f"time sync: {self}")
+
+    async def run(self):
+        delay = self.interval if self.syncs else 0
+        while True:
+            await asyncio.sleep(delay)
+            if await self.sync():
+                self.retries = 0
+                delay = self.interval
+            else:
+                # exponential backoff, capped at the regular sync interval
+                delay = min(NTP_RETRY_DELAY * (1 << self.retries), self.interval)
+                if self.retries < 16:
+                    self.retries += 1
+            memory.poll()
+
+    def __str__(self):
+        return f"source={self.source} syncs={self.syncs} failures={self.failures} latency_ms={self.latency_ms} offset_ms={self.offset_ms} bytes={self.bytes}"
+
+
+class TimeBeacon:
+    # Fleet time over MQTT: one node publishes "<utc seconds>.<ms>" retained
+    # on NTP_BEACON_TOPIC, the others discipline their clocks from it
+    name = "mqtt"
+
+    def __init__(self, timesync, topic=NTP_BEACON_TOPIC):
+        self.timesync = timesync
+        self.topic = topic
+        self.bytes = 0
+        self.published = 0
+        self.ignored = 0
+        self.pending_offset = None
+
+    def publish(self, client):
+        now = frame_clock.time_ms()
+        local = now // 1000
+        utc = local - utc_offset(local - utc_offset(local))
+        payload = f"{utc}.{now % 1000:03d}"
+        client.publish(self.topic, payload, retain=True, qos=0)
+        self.published += 1
+        self.bytes = len(payload)
+
+    def receive(self, message):
+        seconds, _, fraction = message.partition(".")
+        ts = int(seconds)
+        remote_ms = (ts + utc_offset(ts)) * 1000 + int((fraction + "000")[:3])
+        offset = remote_ms - frame_clock.time_ms()
+        if self.timesync.syncs and abs(offset) > NTP_SLEW_LIMIT_MS:
+            # may be a stale retained beacon (publisher offline), only step
+            # the clock once the following beacon agrees with it
+            previous, self.pending_offset = self.pending_offset, offset
+            if previous is None or abs(offset - previous) > NTP_SLEW_LIMIT_MS:
+                self.ignored += 1
+                warning("time beacon: ignored offset_ms=%d", offset)
+                return
+        self.pending_offset = None
+        self.bytes = len(message)
+        self.timesync.apply(self, remote_ms)
+
+    async def run(self, client, interval=NTP_BEACON_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            if not self.timesync.syncs:
+                continue
+            try:
+                self.publish(client)
+            except Exception as error:
+                warning("time beacon: publish failed error=%s", error)
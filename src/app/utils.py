@@ -1,25 +1,82 @@
-import gc
-import json
 import math
 import time
-import adafruit_requests as requests
-from rtc import RTC
-
-from app.constants import DEBUG
+from adafruit_ticks import ticks_ms
+
+from app.constants import LOG_LEVEL, LOG_SERIAL, LOG_BUFFER_SIZE
+
+LOG_DEBUG = 0
+LOG_INFO = 1
+LOG_WARNING = 2
+LOG_ERROR = 3
+LOG_LEVEL_NAMES = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+
+class LogBuffer:
+    # Preallocated ring of formatted records, printed/published in batches
+    # by log_drain once the event loop runs (synchronous print before that)
+    def __init__(self, size=LOG_BUFFER_SIZE, level=LOG_LEVEL, serial=LOG_SERIAL):
+        self.size = size
+        self.level = LOG_LEVEL_NAMES.index(level.upper())
+        self.serial = serial
+        self.deferred = False
+        self.messages = [None] * size
+        self.levels = bytearray(size)
+        self.times = [0] * size
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.count
+
+    def put(self, level, msg):
+        if not self.deferred:
+            if self.serial:
+                print(f"{LOG_LEVEL_NAMES[level]} [{ticks_ms()}] > {msg}")
+            return
+        if self.count == self.size:
+            self.head = (self.head + 1) % self.size
+            self.count -= 1
+            self.dropped += 1
+        index = (self.head + self.count) % self.size
+        self.messages[index] = msg
+        self.levels[index] = level
+        self.times[index] = ticks_ms()
+        self.count += 1
+
+    def get(self):
+        index = self.head
+        msg = self.messages[index]
+        self.messages[index] = None
+        self.head = (index + 1) % self.size
+        self.count -= 1
+        return f"{LOG_LEVEL_NAMES[self.levels[index]]} [{self.times[index]}] > {msg}"
+
+
+log_buffer = LogBuffer()
+
+
+def log(level, msg, *args):
+    # args are only formatted (msg % args) when the level is enabled
+    if level < log_buffer.level:
+        return
+    if args:
+        msg = msg % args
+    log_buffer.put(level, msg)
 
 
 def logger(msg, *args):
-    _log_print("INFO", msg, *args)
+    if LOG_INFO >= log_buffer.level:
+        log(LOG_INFO, msg, *args)
 
 
 def debug(msg, *args):
-    global DEBUG
-    if DEBUG:
-        _log_print("DEBUG", msg, *args)
+    if LOG_DEBUG >= log_buffer.level:
+        log(LOG_DEBUG, msg, *args)
 
 
-def _log_print(level, msg, *args):
-    print(f"{level} [mem:{gc.mem_free()}] > {msg}", *args)
+def warning(msg, *args):
+    log(LOG_WARNING, msg, *args)
 
 
 def matrix_rotation(accelerometer):
@@ -41,43 +98,6 @@ def matrix_rotation(accelerometer):
     ) * 90
 
 
-def fetch_json(url, retry_count=3):
-    failures = 0
-    response = None
-    logger(f"json fetch: url={url} retry_count={retry_count}")
-    while not response:
-        try:
-            response = requests.get(url)
-            failures = 0
-        except AssertionError as error:
-            logger(f"fetch retrying: error={error}")
-            failures += 1
-            if failures >= retry_count:
-                raise AssertionError("fetch error") from error
-            continue
-    return json.loads(response.text)
-
-
-def get_new_epochs(ts_last=None):
-    now = RTC().datetime
-    ts = time.monotonic()
-    if ts_last is None:
-        return (ts, [True, True, True])
-    epochs=[None, None, None] # h, m, s
-    if ts_last is None or ts > ts_last + 1:
-        epochs[2] = True
-        # logger(f"epoch: second")
-        ts_last = ts 
-        if now.tm_sec == 0:
-            epochs[1] = True
-            logger(f"epoch: minute")
-            if now.tm_min == 0:
-                epochs[0] = True
-                logger(f"epoch: hour")
-    # logger(f"epochs: hour={epochs[0]} min={epochs[1]} sec={epochs[2]}")
-    return (ts_last, epochs)
-
-
 def parse_timestamp(timestamp, is_dst=-1):
     # 2022-11-04 21:46:57.174 308 5 +0000 UTC
     bits = timestamp.split("T")
@@ -1,18 +1,22 @@
 import gc
 import random
-from displayio import Group, Palette
-from vectorio import Circle, Rectangle
+from displayio import Group
 
 from app.display import (
     AnimatedTileGrid,
-    ClockLabel,
-    CalendarLabel,
+    ClockWidget,
+    CalendarWidget,
+    ParallaxLayer,
+    layer_palette,
     load_bitmap,
+    starfield_bitmap,
 )
 from app.utils import logger
 
 
-spritesheet, pixel_shader = load_bitmap("/theme.bmp", transparent_index=7)
+spritesheet, pixel_shader = load_bitmap(
+    "/themes/gradius.bmp", transparent_index=7, tiles=range(5), tile_width=32, tile_height=16
+)
 gc.collect()
 
 SPRITE_GRADIUS_RIGHT_HARD = 0
@@ -20,6 +24,16 @@ SPRITE_GRADIUS_RIGHT = 1
 SPRITE_GRADIUS_CENTER = 2
 SPRITE_GRADIUS_LEFT = 3
 SPRITE_GRADIUS_LEFT_HARD = 4
+STARS_BACKGROUND = 5  # per screen width
+STARS_FOREGROUND = 3
+# bank tile by vertical distance to the target, clamped to -4..4
+SPRITE_GRADIUS_BANK = bytes(
+    [SPRITE_GRADIUS_LEFT_HARD]
+    + [SPRITE_GRADIUS_LEFT] * 3
+    + [SPRITE_GRADIUS_CENTER]
+    + [SPRITE_GRADIUS_RIGHT] * 3
+    + [SPRITE_GRADIUS_RIGHT_HARD]
+)
 
 
 class GradiusSprite(AnimatedTileGrid):
@@ -37,12 +51,13 @@ class GradiusSprite(AnimatedTileGrid):
             x_range=x_range,
             y_range=y_range,
         )
+        self._tile = SPRITE_GRADIUS_CENTER
 
     def tick(self, store):
         frame = store["frame"]
         if frame % 30 == 0 and random.randint(1, 10) == 1:
             self.set_random_target()
-        self._set_tile(frame)
+        self._set_tile()
         super().tick(store)
 
     def set_random_target(self):
@@ -53,71 +68,19 @@ class GradiusSprite(AnimatedTileGrid):
             y=y_target,
         )
 
-    def _set_tile(self, frame):
-        current = self.y
+    def _set_tile(self):
         target = self._animate_y_target
         if target is None:
-            self[0] = SPRITE_GRADIUS_CENTER
+            tile = SPRITE_GRADIUS_CENTER
         else:
-            diff = target - current
-            if diff <= -4:
-                self[0] = SPRITE_GRADIUS_LEFT_HARD
-            elif diff >= -3 and diff <= -1:
-                self[0] = SPRITE_GRADIUS_LEFT
-            elif diff <= 3 and diff >= 1:
-                self[0] = SPRITE_GRADIUS_RIGHT
-            elif diff >= 4:
-                self[0] = SPRITE_GRADIUS_RIGHT_HARD
-
-
-class BackgroundStarsGroup(Group):
-    def __init__(self, x, y, display_width, display_height, count=5):
-        super().__init__(x=x, y=y)
-        self.display_width = display_width
-        self.display_height = display_height
-        self.count = count
-        palette = Palette(1)
-        palette[0] = 0x101010
-        for i in range(count):
-            star = Rectangle(
-                pixel_shader=palette,
-                width=1,
-                height=1,
-                x=random.randrange(0, self.display_width),
-                y=random.randrange(0, self.display_height),
-            )
-            self.append(star)
-
-    def tick(self, store):
-        self.x -= 1
-        if self.x < 0 - self.display_width:
-            self.x = self.display_width
-
-
-class ForegroundStarsGroup(Group):
-    def __init__(self, x, y, display_width, display_height, count=3):
-        super().__init__(x=x, y=y)
-        self.display_width = display_width
-        self.display_height = display_height
-        self.count = count
-        palette = Palette(1)
-        palette[0] = 0x111166
-        for i in range(count):
-            star = Circle(
-                pixel_shader=palette,
-                radius=1,
-                x=random.randrange(0, self.display_width),
-                y=random.randrange(0, self.display_height),
-            )
-            self.append(star)
-
-    def tick(self, store):
-        self.x -= 2
-        if self.x < 0 - self.display_width:
-            self.x = self.display_width
+            tile = SPRITE_GRADIUS_BANK[max(-4, min(4, target - self.y)) + 4]
+        if tile != self._tile:
+            self[0] = self._tile = tile
 
 
 class Theme:
+    frame_rate = 30
+
     def __init__(self, width, height, font):
         logger(f"theme setup: width={width} height={height} font={font}")
         self.width = width
@@ -127,14 +90,16 @@ class Theme:
         # SETUP ROOT DISPLAYIO GROUP
         self.group = Group()
         # Add background
-        self.bg1 = BackgroundStarsGroup(0, 0, width, height)
-        self.group.append(self.bg1)
-        self.bg2 = BackgroundStarsGroup(width, 0, width, height)
-        self.group.append(self.bg2)
-        self.fg1 = ForegroundStarsGroup(0, 0, width, height)
-        self.group.append(self.fg1)
-        self.fg2 = ForegroundStarsGroup(width, 0, width, height)
-        self.group.append(self.fg2)
+        self.bg = ParallaxLayer(
+            starfield_bitmap(width, height, STARS_BACKGROUND), layer_palette(0x101010), speed=1
+        )
+        self.group.append(self.bg)
+        self.fg = ParallaxLayer(
+            starfield_bitmap(width, height, STARS_FOREGROUND, radius=1),
+            layer_palette(0x111166),
+            speed=2,
+        )
+        self.group.append(self.fg)
         # Add Pipe sprite
         ship_x = (width // 2) - 16
         ship_y = (height // 2) - 8
@@ -143,9 +108,9 @@ class Theme:
         )
         self.group.append(self.ship)
         # ADD CLOCK / DATE
-        self.clock = ClockLabel(x=33, y=2, font=font)
+        self.clock = ClockWidget(x=33, y=2, font=font)
         self.group.append(self.clock)
-        self.calendar = CalendarLabel(x=0, y=2, font=font)
+        self.calendar = CalendarWidget(x=0, y=2, font=font)
         self.group.append(self.calendar)
 
     def tick(
@@ -157,7 +122,8 @@ class Theme:
         self.clock.tick(store, epochs)
         self.calendar.tick(store, epochs)
         self.ship.tick(store)
-        self.bg1.tick(store)
-        self.bg2.tick(store)
-        self.fg1.tick(store)
-        self.fg2.tick(store)
+        self.bg.tick(store)
+        self.fg.tick(store)
+
+    def resume(self, elapsed_ms):
+        self.ship.fast_forward()
@@ -1,19 +1,28 @@
 import gc
 import random
 from displayio import Group
-from rtc import RTC
 
+from app.clock import frame_clock, EPOCH_SECOND
 from app.display import (
     TileGrid,
     AnimatedTileGrid,
-    ClockLabel,
-    CalendarLabel,
+    ActorPool,
+    AnimationClip,
+    ClockWidget,
+    CalendarWidget,
+    EntityColor,
     load_bitmap,
+    palette_brightness,
 )
-from app.utils import logger, rgb_dict_to_hex
+from app.utils import logger
 
 
-spritesheet, pixel_shader = load_bitmap("/theme.bmp", transparent_index=15)
+spritesheet, pixel_shader = load_bitmap(
+    "/themes/mario.bmp", transparent_index=15, tiles=range(10), tile_width=16, tile_height=16
+)
+# pipe colours follow the a_rgb light instead of the global brightness
+palette_brightness.pin(pixel_shader, 13)
+palette_brightness.pin(pixel_shader, 14)
 gc.collect()
 
 SPRITE_MARIO_STILL = 0
@@ -26,103 +35,6 @@ SPRITE_ROCK = 8
 SPRITE_PIPE = 9
 
 
-class MarioSprite(AnimatedTileGrid):
-    def __init__(
-        self,
-        x,
-        y,
-        x_range=None,
-    ):
-        super().__init__(
-            bitmap=spritesheet,
-            pixel_shader=pixel_shader,
-            width=1,
-            height=1,
-            tile_width=16,
-            tile_height=16,
-            default_tile=SPRITE_MARIO_WALK_START,
-            x=x,
-            y=y,
-            x_range=x_range,
-        )
-        self.move_every_frames = random.randint(50, 200)
-        self._animate_tile_start = SPRITE_MARIO_WALK_START
-        self._animate_frames_per_tile = 2
-        self._animate_tile_index = 0
-        self._animate_tile_count = 3
-
-    def tick(self, store):
-        frame = store["frame"]
-        if frame % self.move_every_frames == 0 and random.randint(1, 3) == 1:
-            self.set_random_target()
-        self._animate_tiles(frame)
-        self._set_tile()
-        super().tick(store)
-
-    def set_random_target(self):
-        if self._animate_x_range is None:
-            return
-        self.set_target(
-            random.randint(self._animate_x_range[0], self._animate_x_range[1])
-        )
-
-    def _animate_tiles(self, frame):
-        if frame % self._animate_frames_per_tile == 0:
-            self._animate_tile_index += 1
-            if self._animate_tile_index > self._animate_tile_count - 1:
-                self._animate_tile_index = 0
-
-    def _set_tile(self):
-        self.flip_x = self._animate_x_dir_last < 0
-        if self._animate_x_velocity == 0 and self._animate_y_velocity == 0:
-            self[0] = SPRITE_MARIO_STILL
-        else:
-            self[0] = self._animate_tile_start + self._animate_tile_index
-
-
-class GoombaSprite(AnimatedTileGrid):
-    def __init__(
-        self,
-        x,
-        y,
-        x_range=None,
-    ):
-        super().__init__(
-            bitmap=spritesheet,
-            pixel_shader=pixel_shader,
-            width=1,
-            height=1,
-            tile_width=16,
-            tile_height=16,
-            default_tile=SPRITE_GOOMBA_WALK,
-            x=x,
-            y=y,
-            x_range=x_range,
-        )
-        self.move_every_frames = random.randint(50, 200)
-
-    def tick(self, store):
-        frame = store["frame"]
-        if frame % self.move_every_frames == 0 and random.randint(1, 6) == 1:
-            self.set_random_target()
-        self._set_tile(frame)
-        super().tick(store)
-
-    def set_random_target(self):
-        if self._animate_x_range is None:
-            return
-        self.set_target(
-            random.randint(self._animate_x_range[0], self._animate_x_range[1])
-        )
-
-    def _set_tile(self, frame):
-        self.flip_x = frame % 4 < 2
-        if self._animate_x_velocity == 0 and self._animate_y_velocity == 0:
-            self[0] = SPRITE_GOOMBA_STILL
-        else:
-            self[0] = SPRITE_GOOMBA_WALK
-
-
 class BrickSprite(TileGrid):
     def __init__(self, x, y, width=1):
         super().__init__(
@@ -167,29 +79,31 @@ class PipeSprite(AnimatedTileGrid):
             y=y,
         )
         self.y_base = y
-        self.last_second = None
+        self._color = EntityColor()
+        self._color_dim = EntityColor(dim=True)
+        frame_clock.subscribe(EPOCH_SECOND, self._on_second)
 
     def tick(self, store):
-        rgb = rgb_dict_to_hex(store["entities"]["a_rgb"].state["color"], store["entities"]["a_rgb"].state["brightness"])
-        rgb_dark = rgb_dict_to_hex(store["entities"]["a_rgb"].state["color"], int(store["entities"]["a_rgb"].state["brightness"] * 0.5))
-        visible = store["entities"]["a_rgb"].state["state"] == "ON"
-        self.hidden = not visible
-        self.pixel_shader[13] = rgb
-        self.pixel_shader[14] = rgb_dark
-        now = RTC().datetime
-        minute = now.tm_min
-        second = now.tm_sec
-        if self.last_second is not None or second != self.last_second:
-            self.last_second = second
-            self.set_target(x=None, y=self.y_base + 11 - (second // 5))
+        entity = store["entities"]["a_rgb"]
+        frame_rate = store["frame_rate"]
+        if self._color.update(entity, frame_rate):
+            self.hidden = not self._color.on
+            self.pixel_shader[13] = self._color.color
+        if self._color_dim.update(entity, frame_rate):
+            self.pixel_shader[14] = self._color_dim.color
         super().tick(store)
 
+    def _on_second(self, now):
+        self.set_target(x=None, y=self.y_base + 11 - (now.tm_sec // 5))
+
     def set_random_target(self):
         if self._animate_x_range is None:
             return
 
 
 class Theme:
+    frame_rate = 30
+
     def __init__(self, width, height, font):
         logger(f"theme setup: width={width} height={height} font={font}")
         self.width = width
@@ -198,8 +112,6 @@ class Theme:
         # SETUP LOCAL VARS
         y_floor = height - 16 if height > 32 else height - 8
         y_actor = height - 32 if height > 32 else height - 24
-        # SETUP STATE
-        self.actors = []
         # SETUP ROOT DISPLAYIO GROUP
         self.group = Group()
         # Add Pipe sprite
@@ -208,24 +120,40 @@ class Theme:
             y_actor,
         )
         self.group.append(self.pipe)
-        # Add Mario sprite
-        self.mario = MarioSprite(
-            random.randint(0, width), y_actor, x_range=[-16, width + 16]
+        # Add Mario and Goomba sprites
+        self.actors = ActorPool(spritesheet, pixel_shader, 16, 16, capacity=2)
+        self.actors.add(
+            random.randint(0, width),
+            y_actor,
+            walk=AnimationClip(
+                SPRITE_MARIO_WALK_START,
+                length=3,
+                frames_per_tile=2,
+                frame_rate=self.frame_rate,
+            ),
+            still=AnimationClip(SPRITE_MARIO_STILL),
+            x_range=(-16, width + 16),
+            retarget_every=random.randint(50, 200),
+            retarget_chance=3,
         )
-        self.group.append(self.mario)
-        # Add Goomba sprite
-        self.goomba = GoombaSprite(
-            random.randint(0, width), y_actor, x_range=[-16, width + 16]
+        self.actors.add(
+            random.randint(0, width),
+            y_actor,
+            walk=AnimationClip(SPRITE_GOOMBA_WALK, flip_every=2, frame_rate=self.frame_rate),
+            still=AnimationClip(SPRITE_GOOMBA_STILL, flip_every=2, frame_rate=self.frame_rate),
+            x_range=(-16, width + 16),
+            retarget_every=random.randint(50, 200),
+            retarget_chance=6,
         )
-        self.group.append(self.goomba)
+        self.group.append(self.actors)
         # Add floor sprites
         floor_sprite = random.choice([RockSprite, BrickSprite])
         self.floor = floor_sprite(0, y_floor, width // 16)
         self.group.append(self.floor)
         # ADD CLOCK / DATE
-        self.clock = ClockLabel(x=33, y=2, font=font)
+        self.clock = ClockWidget(x=33, y=2, font=font)
         self.group.append(self.clock)
-        self.calendar = CalendarLabel(x=0, y=2, font=font)
+        self.calendar = CalendarWidget(x=0, y=2, font=font)
         self.group.append(self.calendar)
 
     def tick(
@@ -236,6 +164,9 @@ class Theme:
         # logger(f"theme: frame={frame}")
         self.clock.tick(store, epochs)
         self.calendar.tick(store, epochs)
-        self.mario.tick(store)
-        self.goomba.tick(store)
+        self.actors.tick(store)
         self.pipe.tick(store)
+
+    def resume(self, elapsed_ms):
+        self.actors.fast_forward()
+        self.pipe.fast_forward()